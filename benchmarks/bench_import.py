@@ -0,0 +1,80 @@
+"""
+Package import time benchmark
+
+Imports net_async entry points in fresh interpreters with -X importtime and reports the best wall time, the
+cumulative import time of the package, whether netmiko and textfsm were loaded, and optionally the slowest modules.
+Exits 1 if a validation only import exceeds --budget milliseconds, so CLI startup regressions can be tracked.
+
+Usage:
+    python benchmarks/bench_import.py --runs 5 --top 10 --budget 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = (
+    ('import net_async', True),
+    ('from net_async import ipv4, MgmtIPAddresses', True),
+    ('from net_async import Checkpoint, JSONLSink, Scheduler', True),
+    ('from net_async import AsyncSessions', False),
+    ('from net_async import AsyncioSessions, SessionPool, ShardedSessions', False),
+    ('from net_async import Connection; Connection', False)
+)
+"""Statements timed and whether they are validation only paths held to --budget"""
+
+PROBE = '''
+import sys
+from time import perf_counter
+start = perf_counter()
+{statement}
+print(perf_counter() - start, 'netmiko' in sys.modules, 'textfsm' in sys.modules)
+'''
+
+
+def measure(statement):
+    """
+    :param statement: Python statement importing from net_async
+    :return: Tuple of wall seconds, netmiko loaded, textfsm loaded and list of (microseconds, module) imports
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(statement=statement)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, netmiko, textfsm = process.stdout.split()
+    imports = []
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative), module.rstrip()))
+    return float(seconds), netmiko == 'True', textfsm == 'True', imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=None)
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f'{"statement":<70} {"best":>9} {"package":>9}  netmiko  textfsm')
+    for statement, validation in STATEMENTS:
+        runs = [measure(statement) for _ in range(args.runs)]
+        seconds, netmiko, textfsm, imports = min(runs, key=lambda run: run[0])
+        package = sum(cumulative for cumulative, module in imports
+                      if module.startswith(' net_async') and not module.startswith('  '))
+        print(f'{statement:<70} {seconds * 1000:7.1f}ms {package / 1000:7.1f}ms  {netmiko!s:<7}  {textfsm!s:<7}')
+        if args.top:
+            for cumulative, module in sorted(imports, reverse=True)[:args.top]:
+                print(f'    {cumulative / 1000:8.1f}ms {module}')
+        if validation and args.budget is not None and seconds * 1000 > args.budget:
+            over_budget = True
+    if over_budget:
+        print(f'Validation only import exceeded {args.budget}ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
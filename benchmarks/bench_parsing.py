@@ -0,0 +1,73 @@
+"""
+TextFSM parsing throughput benchmark
+
+Compares netmiko's uncached get_structured_data, net_async's cached parse_output and ParserPool while
+multiple threads parse large 'show ip interface brief' outputs at once.
+
+Usage:
+    python benchmarks/bench_parsing.py --threads 100 --outputs 1000 --lines 500
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    'NET_TEXTFSM', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'net_async', 'templates')
+)
+
+from netmiko.utilities import get_structured_data  # noqa: E402
+from net_async.parsing import parse_output, ParserPool  # noqa: E402
+
+PLATFORM = 'cisco_ios'
+COMMAND = 'show ip interface brief'
+
+
+def raw_output(lines):
+    """
+    :param lines: Number of interfaces
+    :return: Synthetic 'show ip interface brief' output
+    """
+    output = 'Interface              IP-Address      OK? Method Status                Protocol\n'
+    for num in range(lines):
+        output += f'GigabitEthernet1/0/{num:<4}   10.{num // 256 % 256}.{num % 256}.1      YES manual up' \
+                  f'                    up\n'
+    return output
+
+
+def run(name, parse, threads, outputs, raw):
+    """
+    :param name: Benchmark name
+    :param parse: Function accepting platform, command and raw output
+    :param threads: Number of parsing threads
+    :param outputs: Number of outputs to parse
+    :param raw: Raw output to parse
+    """
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda _: parse(PLATFORM, COMMAND, raw), range(outputs)))
+    seconds = perf_counter() - start
+    assert all(isinstance(result, list) for result in results)
+    print(f'{name:<28} {seconds:8.2f}s {outputs / seconds:10.1f} outputs/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=100)
+    parser.add_argument('--outputs', type=int, default=1000)
+    parser.add_argument('--lines', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    raw = raw_output(args.lines)
+
+    run('netmiko get_structured_data', lambda platform, command, output: get_structured_data(
+        output, platform=platform, command=command), args.threads, args.outputs, raw)
+    run('cached parse_output', parse_output, args.threads, args.outputs, raw)
+    with ParserPool(args.processes) as pool:
+        run(f'ParserPool({args.processes})', pool.parse, args.threads, args.outputs, raw)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Dispatch order makespan benchmark
+
+Runs sleep based device jobs with a heavy tail of slow WAN and TELNET devices on a thread pool, first with the
+previous Pool.map static chunking, then one at a time in file order, then one at a time longest first using the
+DurationHistory learned from the file order run. Slow devices are placed at the end of the file, the worst case for
+file order. Also prints the simulated makespans of RunReport.makespan_comparison and the lower bound of any order.
+
+Usage:
+    python benchmarks/bench_scheduling.py --devices 2000 --threads 50 --slow-rate 0.02 --telnet-rate 0.05
+"""
+import argparse
+import os
+import random
+import sys
+from multiprocessing.dummy import Pool
+from time import perf_counter, sleep
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from net_async.metrics import RunReport  # noqa: E402
+from net_async.scheduler import DurationHistory, Scheduler  # noqa: E402
+
+
+def build_durations(devices, slow_rate, telnet_rate, tail, seed=0):
+    """
+    :param devices: Number of devices
+    :param slow_rate: Fraction of slow WAN devices
+    :param telnet_rate: Fraction of TELNET fallback devices
+    :param tail: Fraction of the file at the end where slow and TELNET devices are placed
+    :param seed: Random seed
+    :return: Dictionary of session seconds keyed by management IP address in file order
+    """
+    rand = random.Random(seed)
+    fast = [rand.uniform(0.01, 0.03) for _ in range(devices)]
+    slow = int(devices * slow_rate)
+    telnet = int(devices * telnet_rate)
+    start = devices - max(int(devices * tail), slow + telnet)
+    positions = rand.sample(range(start, devices), slow + telnet)
+    for num, position in enumerate(positions):
+        fast[position] = rand.uniform(0.5, 1.0) if num < slow else rand.uniform(0.15, 0.3)
+    return {f'10.{num // 65536}.{num // 256 % 256}.{num % 256}': seconds for num, seconds in enumerate(fast)}
+
+
+def run(name, mgmt_ips, durations, threads, report, chunksize=1):
+    """
+    :param name: Benchmark name
+    :param mgmt_ips: Management IP addresses in dispatch order
+    :param durations: Dictionary of session seconds keyed by management IP address
+    :param threads: Number of threads
+    :param report: RunReport devices are added to
+    :param chunksize: None for Pool.map default chunking, otherwise items per dispatch
+    :return: Wall seconds
+    """
+    def session(ip_address):
+        start = perf_counter()
+        sleep(durations[ip_address])
+        report.add(ip_address, {'setup': 0.0, 'function': perf_counter() - start, 'disconnect': 0.0}, True)
+
+    with Pool(threads) as thread_pool:
+        if chunksize is None:
+            thread_pool.map(session, mgmt_ips)
+        else:
+            for _ in thread_pool.imap_unordered(session, mgmt_ips, chunksize=chunksize):
+                pass
+    report.complete()
+    print(f'{name:<40} {report.wall_time:8.3f}s')
+    return report.wall_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--slow-rate', type=float, default=0.02)
+    parser.add_argument('--telnet-rate', type=float, default=0.05)
+    parser.add_argument('--tail', type=float, default=0.1)
+    args = parser.parse_args()
+
+    durations = build_durations(args.devices, args.slow_rate, args.telnet_rate, args.tail)
+    mgmt_ips = list(durations)
+
+    run('Pool.map static chunks, file order', mgmt_ips, durations, args.threads, RunReport(), chunksize=None)
+    history = DurationHistory()
+    file_report = RunReport([history])
+    file_time = run('one at a time, file order', mgmt_ips, durations, args.threads, file_report)
+    scheduled_order = Scheduler(longest_first=True, history=history).order(mgmt_ips)
+    scheduled_time = run('one at a time, longest first', scheduled_order, durations, args.threads, RunReport())
+    print(f'{"measured improvement":<40} {1 - scheduled_time / file_time:8.1%}')
+
+    comparison = file_report.makespan_comparison(mgmt_ips, scheduled_order, args.threads)
+    print(f'{"simulated file order":<40} {comparison["file_order"]:8.3f}s')
+    print(f'{"simulated longest first":<40} {comparison["scheduled_order"]:8.3f}s')
+    print(f'{"simulated improvement":<40} {comparison["improvement"]:8.1%}')
+    print(f'{"lower bound":<40} {comparison["lower_bound"]:8.3f}s')
+
+
+if __name__ == '__main__':
+    main()
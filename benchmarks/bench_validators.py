@@ -0,0 +1,91 @@
+"""
+Management IP address validation and BugCheck benchmark
+
+Times MgmtIPAddresses ingestion of a large inventory file, with and without CIDR/range expansion and dedup, and
+compares the indexed BugCheck with the previous nested scan on a smaller sample.
+
+Usage:
+    python benchmarks/bench_validators.py --entries 100000 --legacy-entries 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from net_async.validators import BugCheck, MgmtIPAddresses  # noqa: E402
+
+
+def inventory(entries):
+    """
+    :param entries: Number of lines
+    :return: Lines of IPv4 addresses with a duplicate and an invalid address every 1000 lines
+    """
+    lines = []
+    for num in range(entries):
+        if num % 1000 == 999:
+            lines.append('10.300.0.1\n')
+        elif num % 1000 == 998:
+            lines.append(lines[0])
+        else:
+            lines.append(f'10.{num // 65536 % 256}.{num // 256 % 256}.{num % 256}\n')
+    return lines
+
+
+def legacy_bug_check(successful_devices, failed_devices, mgmt_ips):
+    """Previous O(n^2) BugCheck scan"""
+    bug_devices = []
+    for ip in mgmt_ips:
+        if all(ip != s_device['ip_address'] for s_device in successful_devices) and \
+                all(ip != f_device['ip_address'] for f_device in failed_devices):
+            bug_devices.append(ip)
+    return bug_devices
+
+
+def run(name, function):
+    """
+    :param name: Benchmark name
+    :param function: Function to time
+    :return: Function return
+    """
+    start = perf_counter()
+    result = function()
+    print(f'{name:<40} {perf_counter() - start:8.3f}s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--legacy-entries', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'mgmt_ips.txt')
+        with open(path, 'w') as file:
+            file.writelines(inventory(args.entries))
+        cidr_path = os.path.join(directory, 'mgmt_networks.txt')
+        with open(cidr_path, 'w') as file:
+            file.writelines(f'10.{num // 256}.{num % 256}.0/24\n' for num in range(args.entries // 254 + 1))
+
+        mgmt = run(f'MgmtIPAddresses {args.entries} lines', lambda: MgmtIPAddresses(path))
+        run(f'MgmtIPAddresses {args.entries} lines dedup', lambda: MgmtIPAddresses(path, dedup=True))
+        run('MgmtIPAddresses /24 networks expanded', lambda: MgmtIPAddresses(cidr_path, expand=True, dedup=True))
+
+    mgmt_ips = mgmt.mgmt_ips
+    successful_devices = [{'ip_address': ip} for ip in mgmt_ips[::2]]
+    failed_devices = [{'ip_address': ip} for ip in mgmt_ips[1::2][:-100]]
+    bug_check = run(f'BugCheck {len(mgmt_ips)} devices', lambda: BugCheck(successful_devices, failed_devices, mgmt_ips))
+    assert bug_check.bug
+
+    sample = mgmt_ips[:args.legacy_entries]
+    successful_devices = [{'ip_address': ip} for ip in sample[::2]]
+    failed_devices = [{'ip_address': ip} for ip in sample[1::2][:-100]]
+    run(f'BugCheck {len(sample)} devices', lambda: BugCheck(successful_devices, failed_devices, sample))
+    run(f'legacy BugCheck {len(sample)} devices', lambda: legacy_bug_check(successful_devices, failed_devices, sample))
+
+
+if __name__ == '__main__':
+    main()
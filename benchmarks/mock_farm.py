@@ -0,0 +1,537 @@
+"""
+Mock Cisco device farm and AsyncSessions benchmark
+
+Starts fake IOS, IOS-XE and NX-OS devices listening on 127.x.x.x loopback addresses (Linux routes all of
+127.0.0.0/8 to lo) with canned 'show version', 'show inventory' and 'show running-config' output, then runs
+AsyncSessions against them and reports throughput, per phase latency and peak memory for each farm size.
+SSH devices are served with paramiko and TELNET devices over plain sockets, each connection in its own thread
+of a separate farm process. Latency, connection refusals, hung connections, authentication errors and
+unprivileged users can be injected per device.
+
+Usage:
+    python benchmarks/mock_farm.py --devices 100 1000 10000 --threads 100 --latency 0.02
+    python benchmarks/mock_farm.py --devices 500 --telnet-rate 0.1 --refuse-rate 0.02 --auth-fail-rate 0.02
+    python benchmarks/mock_farm.py --serve --devices 50
+"""
+import argparse
+import ipaddress
+import os
+import random
+import re
+import resource
+import selectors
+import socket
+import sys
+import threading
+from multiprocessing import Event, Process, Queue
+from time import perf_counter, sleep
+
+import paramiko
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    'NET_TEXTFSM', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'net_async', 'templates')
+)
+
+from net_async import AsyncSessions  # noqa: E402
+
+USERNAME = 'admin'
+PASSWORD = 'admin'
+ENABLE_PW = 'enable'
+FIRST_ADDRESS = ipaddress.ip_address('127.1.0.1')
+PHASES = ('setup', 'autodetect', 'connect', 'enable', 'privilege_check', 'function', 'disconnect')
+
+SHOW_VERSION = {
+    'ios': """Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(4)E10, RELEASE SOFTWARE (fc2)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2020 by Cisco Systems, Inc.
+Compiled Tue 31-Mar-20 22:04 by prod_rel_team
+
+ROM: Bootstrap program is C2960X boot loader
+BOOTLDR: C2960X Boot Loader (C2960X-HBOOT-M) Version 15.2(3r)E1, RELEASE SOFTWARE (fc1)
+
+{hostname} uptime is 1 week, 2 days, 3 hours, 4 minutes
+System returned to ROM by power-on
+System image file is "flash:c2960x-universalk9-mz.152-4.E10.bin"
+
+cisco WS-C2960X-48FPD-L (APM86XXX) processor (revision B0) with 524288K bytes of memory.
+Processor board ID {serial}
+Last reset from power-on
+1 Virtual Ethernet interface
+52 Gigabit Ethernet interfaces
+
+Model number                    : WS-C2960X-48FPD-L
+System serial number            : {serial}
+
+Configuration register is 0xF
+""",
+    'iosxe': """Cisco IOS XE Software, Version 16.12.04
+Cisco IOS Software [Gibraltar], Catalyst L3 Switch Software (CAT9K_IOSXE), Version 16.12.4, RELEASE SOFTWARE (fc5)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2020 by Cisco Systems, Inc.
+Compiled Thu 09-Jul-20 21:49 by mcpre
+
+ROM: IOS-XE ROMMON
+BOOTLDR: System Bootstrap, Version 16.12.2r, RELEASE SOFTWARE (P)
+
+{hostname} uptime is 1 week, 2 days, 3 hours, 4 minutes
+System returned to ROM by Reload Command
+System image file is "flash:packages.conf"
+
+cisco C9300-48P (X86) processor with 1419044K/6147K bytes of memory.
+Processor board ID {serial}
+2048K bytes of non-volatile configuration memory.
+
+Model Number                       : C9300-48P
+System Serial Number               : {serial}
+
+Configuration register is 0x102
+""",
+    'nxos': """Cisco Nexus Operating System (NX-OS) Software
+TAC support: http://www.cisco.com/tac
+Copyright (C) 2002-2020, Cisco and/or its affiliates.
+All rights reserved.
+
+Software
+  BIOS: version 07.68
+  NXOS: version 9.3(5)
+  BIOS compile time:  04/28/2020
+  NXOS image file is: bootflash:///nxos.9.3.5.bin
+  NXOS compile time:  7/20/2020 20:00:00 [07/21/2020 05:46:32]
+
+Hardware
+  cisco Nexus9000 C93180YC-EX chassis
+  Intel(R) Xeon(R) CPU  @ 1.80GHz with 24632812 kB of memory.
+  Processor Board ID {serial}
+
+  Device name: {hostname}
+  bootflash:   53298520 kB
+Kernel uptime is 10 day(s), 2 hour(s), 3 minute(s), 4 second(s)
+
+Last reset at 561340 usecs after Mon Jan 11 11:29:42 2021
+  Reason: Reset Requested by CLI command reload
+  System version: 9.3(5)
+  Service:
+"""
+}
+
+SHOW_INVENTORY = {
+    'ios': """NAME: "1", DESCR: "WS-C2960X-48FPD-L"
+PID: WS-C2960X-48FPD-L , VID: V05  , SN: {serial}
+""",
+    'iosxe': """NAME: "c93xx Stack", DESCR: "c93xx Stack"
+PID: C9300-48P         , VID: V02  , SN: {serial}
+
+NAME: "Switch 1", DESCR: "C9300-48P"
+PID: C9300-48P         , VID: V02  , SN: {serial}
+""",
+    'nxos': """NAME: "Chassis",  DESCR: "Nexus9000 C93180YC-EX chassis"
+PID: N9K-C93180YC-EX     ,  VID: V03 ,  SN: {serial}
+
+NAME: "Slot 1",  DESCR: "48x10/25G + 6x40/100G Ethernet Module"
+PID: N9K-C93180YC-EX     ,  VID: V03 ,  SN: {serial}
+"""
+}
+
+INVALID_INPUT = "                ^\n% Invalid input detected at '^' marker.\n"
+
+
+class MockDevice:
+    """
+    :param ip_address: Loopback IP address device listens on
+    :param platform: 'ios', 'iosxe' or 'nxos'
+    :param transport: 'SSH' or 'TELNET'
+    :param behavior: 'ok', 'refuse' (nothing listening), 'hang' (accepts, never answers) or 'auth_fail'
+    :param privileged: Bool if user lands in privileged EXEC mode, otherwise enable is required
+    :param latency: Seconds added before each command output
+    :param config_lines: Number of interfaces in 'show running-config'
+    """
+    def __init__(self, ip_address, platform='ios', transport='SSH', behavior='ok', privileged=True, latency=0.0,
+                 config_lines=50):
+        self.ip_address = ip_address
+        self.platform = platform
+        self.transport = transport
+        self.behavior = behavior
+        self.privileged = privileged
+        self.latency = latency
+        self.hostname = f'{platform}-{ip_address.replace(".", "-")}'
+        self.serial = f'FOC{int(ipaddress.ip_address(ip_address)) % 10 ** 8:08d}'
+        self.config_lines = config_lines
+
+    def output(self, command, privileged):
+        """
+        :param command: Command without pipe
+        :param privileged: Bool if session is in privileged EXEC mode
+        :return: Canned command output
+        """
+        words = command.split()
+        if match(words, 'show version'):
+            return SHOW_VERSION[self.platform].format(hostname=self.hostname, serial=self.serial)
+        elif match(words, 'show inventory'):
+            return SHOW_INVENTORY[self.platform].format(serial=self.serial)
+        elif match(words, 'show privilege'):
+            return f'Current privilege level is {15 if privileged else 1}\n'
+        elif match(words, 'show running-config'):
+            if not privileged and self.platform != 'nxos':
+                return INVALID_INPUT
+            config = f'Building configuration...\n\nhostname {self.hostname}\n!\n'
+            for num in range(self.config_lines):
+                config += f'interface GigabitEthernet1/0/{num + 1}\n description mock port {num + 1}\n' \
+                          f' switchport mode access\n!\n'
+            return config + 'end\n'
+        return INVALID_INPUT
+
+
+def match(words, command):
+    """
+    :param words: Words of entered command
+    :param command: Full command
+    :return: Bool if words are abbreviations of command, e.g. 'sh run'
+    """
+    full = command.split()
+    return len(words) == len(full) and all(full_word.startswith(word) for word, full_word in zip(words, full))
+
+
+def pipe(output, modifier):
+    """
+    :param output: Command output
+    :param modifier: Text after '|', e.g. 'include Cisco'
+    :return: Filtered output
+    """
+    words = modifier.split(None, 1)
+    if len(words) < 2:
+        return output
+    keep = words[0] in 'include'
+    if not keep and words[0] not in 'exclude':
+        return output
+    return ''.join(line for line in output.splitlines(True) if bool(re.search(words[1], line)) is keep)
+
+
+class Channel:
+    """
+    Line oriented wrapper of a paramiko channel or socket
+
+    :param connection: Object with recv and sendall
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = b''
+        self.last_cr = False
+
+    def send(self, text):
+        self.connection.sendall(text.replace('\n', '\r\n').encode())
+
+    def readline(self):
+        """
+        :return: Next line without line ending, None if connection closed
+        """
+        while True:
+            for idx, byte in enumerate(self.buffer):
+                if byte in b'\r\n':
+                    line, self.buffer = self.buffer[:idx], self.buffer[idx + 1:]
+                    # Collapses CRLF into one line ending
+                    if byte == 10 and self.last_cr and line == b'':
+                        self.last_cr = False
+                        break
+                    self.last_cr = byte == 13
+                    return line.replace(b'\x00', b'').decode(errors='ignore')
+            else:
+                data = self.connection.recv(4096)
+                if not data:
+                    return None
+                self.buffer += data
+
+
+def serve_shell(channel, device):
+    """
+    Cisco like CLI loop: echoes commands, answers canned output and prompts
+
+    :param channel: Channel
+    :param device: MockDevice
+    """
+    privileged = device.privileged
+
+    def prompt():
+        return f'{device.hostname}{"#" if privileged else ">"}'
+
+    channel.send(f'\n{prompt()}')
+    while True:
+        line = channel.readline()
+        if line is None:
+            return
+        command = line.strip()
+        if command in ('exit', 'quit', 'logout'):
+            return
+        output = ''
+        if command == '' or command.startswith('terminal'):
+            pass
+        elif match(command.split(), 'enable'):
+            if not privileged:
+                channel.send(f'{command}\nPassword: ')
+                secret = channel.readline()
+                if secret is None:
+                    return
+                if secret.strip() == ENABLE_PW:
+                    privileged = True
+                else:
+                    output = '% Access denied\n'
+                channel.send(f'\n{output}{prompt()}')
+                continue
+        else:
+            base, _, modifier = command.partition('|')
+            output = device.output(base.strip(), privileged)
+            if modifier:
+                output = pipe(output, modifier.strip())
+        if device.latency > 0 and command != '':
+            sleep(device.latency * random.uniform(0.5, 1.5))
+        channel.send(f'{command}\n{output}{prompt()}')
+
+
+class SSHServer(paramiko.ServerInterface):
+    """paramiko server accepting password authentication and one interactive shell"""
+    def __init__(self, device):
+        self.device = device
+        self.shell = threading.Event()
+
+    def check_auth_password(self, username, password):
+        if self.device.behavior != 'auth_fail' and username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+
+def handle_ssh(connection, device, host_key):
+    transport = paramiko.Transport(connection)
+    transport.add_server_key(host_key)
+    server = SSHServer(device)
+    try:
+        transport.start_server(server=server)
+        channel = transport.accept(30)
+        if channel is not None and server.shell.wait(10):
+            serve_shell(Channel(channel), device)
+    except (paramiko.SSHException, EOFError, OSError):
+        pass
+    finally:
+        transport.close()
+
+
+def handle_telnet(connection, device):
+    channel = Channel(connection)
+    try:
+        channel.send('\nUser Access Verification\n\nUsername: ')
+        username = channel.readline()
+        channel.send('Password: ')
+        password = channel.readline()
+        if device.behavior == 'auth_fail' or username is None or (username.strip(), password) != (USERNAME, PASSWORD):
+            channel.send('\n% Login invalid\n')
+            return
+        serve_shell(channel, device)
+    except OSError:
+        pass
+    finally:
+        connection.close()
+
+
+def serve_farm(devices, ssh_port, telnet_port, ready, stop):
+    """
+    Farm process: listens on every device address and serves each connection in its own thread
+
+    :param devices: List of MockDevice
+    :param ssh_port: SSH TCP port of devices
+    :param telnet_port: TELNET TCP port of devices
+    :param ready: Event set once all devices are listening
+    :param stop: Event stopping farm
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    host_key = paramiko.RSAKey.generate(2048)
+    selector = selectors.DefaultSelector()
+    hung = []
+    for device in devices:
+        if device.behavior == 'refuse':
+            continue
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((device.ip_address, ssh_port if device.transport == 'SSH' else telnet_port))
+        listener.listen(128)
+        listener.setblocking(False)
+        selector.register(listener, selectors.EVENT_READ, device)
+    ready.set()
+    while not stop.is_set():
+        for key, mask in selector.select(timeout=0.5):
+            device = key.data
+            try:
+                connection, address = key.fileobj.accept()
+            except BlockingIOError:
+                continue
+            connection.setblocking(True)
+            if device.behavior == 'hang':
+                hung.append(connection)
+            elif device.transport == 'SSH':
+                threading.Thread(target=handle_ssh, args=(connection, device, host_key), daemon=True).start()
+            else:
+                threading.Thread(target=handle_telnet, args=(connection, device), daemon=True).start()
+
+
+class MockFarm:
+    """
+    Runs a farm of MockDevices in a separate process
+
+    :param devices: List of MockDevice
+    :param ssh_port: SSH TCP port of devices
+    :param telnet_port: TELNET TCP port of devices
+    """
+    def __init__(self, devices, ssh_port=2222, telnet_port=2323):
+        self.devices = devices
+        self.ssh_port = ssh_port
+        self.telnet_port = telnet_port
+        self.ready = Event()
+        self.stop_event = Event()
+        self.process = Process(
+            target=serve_farm, args=(devices, ssh_port, telnet_port, self.ready, self.stop_event), daemon=True
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.process.start()
+        if not self.ready.wait(120):
+            raise RuntimeError('Mock farm did not start')
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def build_devices(count, platforms=('ios', 'iosxe', 'nxos'), telnet_rate=0.0, refuse_rate=0.0, hang_rate=0.0,
+                  auth_fail_rate=0.0, unprivileged_rate=0.0, latency=0.0, config_lines=50, seed=0):
+    """
+    :return: List of MockDevice with randomly injected transports and failures
+    """
+    rand = random.Random(seed)
+    devices = []
+    for num in range(count):
+        roll = rand.random()
+        if roll < refuse_rate:
+            behavior = 'refuse'
+        elif roll < refuse_rate + hang_rate:
+            behavior = 'hang'
+        elif roll < refuse_rate + hang_rate + auth_fail_rate:
+            behavior = 'auth_fail'
+        else:
+            behavior = 'ok'
+        devices.append(MockDevice(
+            str(FIRST_ADDRESS + num),
+            platform=platforms[num % len(platforms)],
+            transport='TELNET' if rand.random() < telnet_rate else 'SSH',
+            behavior=behavior,
+            privileged=rand.random() >= unprivileged_rate,
+            latency=latency,
+            config_lines=config_lines
+        ))
+    return devices
+
+
+def show_run(session):
+    return session.send_command('show running-config')
+
+
+def run_sessions(mgmt_ips, args, results):
+    """
+    Benchmark process: runs AsyncSessions against farm and puts summary on results queue
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    start = perf_counter()
+    sessions = AsyncSessions(
+        USERNAME, PASSWORD, mgmt_ips, show_run, ENABLE_PW, threads=args.threads, privilege_check=args.privilege_check,
+        ssh_port=args.ssh_port, telnet_port=args.telnet_port
+    )
+    wall_time = perf_counter() - start
+    summary = sessions.report.summary(percentiles=(50, 90, 99))
+    results.put({
+        'devices': len(mgmt_ips),
+        'successful': len(sessions.successful_devices),
+        'failed': len(sessions.failed_devices),
+        'wall_time': wall_time,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'phases': summary['phases']
+    })
+
+
+def report(result):
+    print(f"\n{result['devices']} devices: {result['successful']} successful, {result['failed']} failed, "
+          f"{result['wall_time']:.2f}s, {result['devices'] / result['wall_time']:.1f} devices/s, "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB")
+    print(f"    {'phase':<18} {'count':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for phase in PHASES:
+        stat = result['phases'].get(phase)
+        if stat is not None:
+            print(f"    {phase:<18} {stat['count']:>7} {stat['p50']:>8.3f} {stat['p90']:>8.3f} {stat['p99']:>8.3f} "
+                  f"{stat['max']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--threads', type=int, default=100)
+    parser.add_argument('--platforms', nargs='+', default=['ios', 'iosxe', 'nxos'], choices=['ios', 'iosxe', 'nxos'])
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before each command output')
+    parser.add_argument('--telnet-rate', type=float, default=0.0)
+    parser.add_argument('--refuse-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--auth-fail-rate', type=float, default=0.0)
+    parser.add_argument('--unprivileged-rate', type=float, default=0.0)
+    parser.add_argument('--config-lines', type=int, default=50)
+    parser.add_argument('--privilege-check', default='show_run')
+    parser.add_argument('--ssh-port', type=int, default=2222)
+    parser.add_argument('--telnet-port', type=int, default=2323)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--serve', action='store_true', help='Only run farm until interrupted')
+    args = parser.parse_args()
+
+    for count in args.devices:
+        devices = build_devices(
+            count, args.platforms, args.telnet_rate, args.refuse_rate, args.hang_rate, args.auth_fail_rate,
+            args.unprivileged_rate, args.latency, args.config_lines, args.seed
+        )
+        with MockFarm(devices, args.ssh_port, args.telnet_port):
+            mgmt_ips = [device.ip_address for device in devices]
+            if args.serve:
+                print(f'Serving {count} devices {mgmt_ips[0]} - {mgmt_ips[-1]}, SSH port {args.ssh_port}, '
+                      f'TELNET port {args.telnet_port}, username {USERNAME}, password {PASSWORD}')
+                try:
+                    while True:
+                        sleep(1)
+                except KeyboardInterrupt:
+                    return
+            results = Queue()
+            process = Process(target=run_sessions, args=(mgmt_ips, args, results))
+            process.start()
+            report(results.get())
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
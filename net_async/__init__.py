@@ -1,19 +1,61 @@
-from net_async.handlers import AsyncSessions, Connection, multithread
-from net_async.validators import BugCheck, ipv4, ipv6, macaddress, MgmtIPAddresses
-from net_async.exceptions import TemplatesNotFoundWithinPackage, MissingArgument, InputError, ForceSessionRetry
+from importlib import import_module
 
 __version__ = 'v1.0.0'
-__all__ = (
-    AsyncSessions,
-    BugCheck,
-    TemplatesNotFoundWithinPackage,
-    MissingArgument,
-    Connection,
-    InputError,
-    multithread,
-    ipv4,
-    ipv6,
-    macaddress,
-    MgmtIPAddresses,
-    ForceSessionRetry
-)
+
+_exports = {
+    'AsyncSessions': 'net_async.handlers',
+    'AsyncioSessions': 'net_async.aio',
+    'AsyncConnection': 'net_async.aio',
+    'BugCheck': 'net_async.validators',
+    'Checkpoint': 'net_async.checkpoint',
+    'config_diff': 'net_async.config_diff',
+    'TemplatesNotFoundWithinPackage': 'net_async.exceptions',
+    'MissingArgument': 'net_async.exceptions',
+    'Connection': 'net_async.handlers',
+    'DeviceRecord': 'net_async.results',
+    'DurationHistory': 'net_async.scheduler',
+    'FingerprintCache': 'net_async.cache',
+    'InputError': 'net_async.exceptions',
+    'JSONLSink': 'net_async.results',
+    'LatencyTracker': 'net_async.latency',
+    'multithread': 'net_async.handlers',
+    'expand_addresses': 'net_async.validators',
+    'ipv4': 'net_async.validators',
+    'ipv6': 'net_async.validators',
+    'macaddress': 'net_async.validators',
+    'MetricsHook': 'net_async.metrics',
+    'MgmtIPAddresses': 'net_async.validators',
+    'OutputStore': 'net_async.changes',
+    'ParserPool': 'net_async.parsing',
+    'parse_output': 'net_async.parsing',
+    'Scheduler': 'net_async.scheduler',
+    'SessionPool': 'net_async.pool',
+    'SQLiteSink': 'net_async.results',
+    'ShardedSessions': 'net_async.sharding',
+    'ForceSessionRetry': 'net_async.exceptions',
+    'INVENTORY_MODES': 'net_async.handlers',
+    'PRIVILEGE_CHECKS': 'net_async.handlers',
+    'reachability_scan': 'net_async.prescan',
+    'ResultSink': 'net_async.results',
+    'RetryPolicy': 'net_async.retry',
+    'async_reachability_scan': 'net_async.prescan',
+    'RunReport': 'net_async.metrics',
+    'run_worker': 'net_async.sharding',
+    'WorkQueueServer': 'net_async.sharding'
+}
+"""Module of each public object, imported on first access so validation only scripts do not load netmiko"""
+
+__all__ = tuple(_exports)
+
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError(f"module 'net_async' has no attribute '{name}'") from None
+    value = globals()[name] = getattr(import_module(module), name)
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
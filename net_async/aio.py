@@ -0,0 +1,203 @@
+import asyncio
+import queue
+from functools import partial
+from inspect import iscoroutinefunction
+from net_async.handlers import AsyncSessions
+from net_async.metrics import RunReport
+from net_async.exceptions import InputError
+
+
+def settle(future, result=None, error=None):
+    """
+    Sets result or exception of an asyncio future unless it was already cancelled
+
+    :param future: asyncio Future
+    :param result: Result to set
+    :param error: Exception to set instead of result
+    """
+    if future.done():
+        return
+    elif error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def run_coroutine(function, loop, session):
+    """
+    Runs coroutine function on event loop from a session thread, executing its device I/O on this thread\n
+    The session thread waits on the coroutine anyway, so awaiting an AsyncConnection method hands the blocking call
+    back to it instead of occupying a second thread.
+
+    :param function: Coroutine function to run on device
+    :param loop: Running event loop
+    :param session: Connection object
+    :return: Function output
+    """
+    calls = queue.Queue()
+    done = asyncio.run_coroutine_threadsafe(function(AsyncConnection(session, calls, loop)), loop)
+    done.add_done_callback(lambda _: calls.put(None))
+    while True:
+        call = calls.get()
+        if call is None:
+            return done.result()
+        future, method = call
+        try:
+            loop.call_soon_threadsafe(settle, future, method())
+        except Exception as e:
+            loop.call_soon_threadsafe(partial(settle, future, error=e))
+
+
+class AsyncConnection:
+    """
+    Awaitable wrapper of Connection provided to 'async def' functions\n
+    Connection attributes (hostname, privileged, etc.) are available directly on this object.
+
+    :param connection: Connection object
+    :param calls: Queue of blocking calls run by the session thread
+    :param loop: Running event loop
+    """
+    def __init__(self, connection, calls, loop):
+        self.connection = connection
+        self.calls = calls
+        self.loop = loop
+
+    def __getattr__(self, item):
+        return getattr(self.connection, item)
+
+    async def _run(self, method, *args):
+        future = self.loop.create_future()
+        self.calls.put((future, partial(method, *args)))
+        return await future
+
+    async def send_command(self, command, delay_factor=None):
+        """
+        :param command: Command to run
+        :param delay_factor: delay_factor override for this call
+        :return: Output of command
+        """
+        return await self._run(self.connection.send_command, command, delay_factor)
+
+    async def send_commands(self, commands, pipeline=False, delay_factor=None):
+        """
+        :param commands: List of commands to run
+        :param pipeline: Bool to write all commands at once and split output on device prompt
+        :param delay_factor: delay_factor override for this call
+        :return: Dictionary of output keyed by command
+        """
+        return await self._run(self.connection.send_commands, commands, pipeline, delay_factor)
+
+    async def send_config_set(self, config_set, delay_factor=None, incremental=False, dry_run=False):
+        """
+        :param config_set: List of commands
+        :param delay_factor: delay_factor override for this call
+        :param incremental: Bool to only send lines missing from running config
+        :param dry_run: Bool to return lines an incremental push would send without sending them
+        :return: Output of commands, list of config lines if dry_run
+        """
+        return await self._run(self.connection.send_config_set, config_set, delay_factor, incremental, dry_run)
+
+    async def send_config_file(self, config_file, delay_factor=None, incremental=False, dry_run=False):
+        """
+        :param config_file: Location of config .txt file
+        :param delay_factor: delay_factor override for this call
+        :param incremental: Bool to only send lines missing from running config
+        :param dry_run: Bool to return lines an incremental push would send without sending them
+        :return: Output of commands, list of config lines if dry_run
+        """
+        return await self._run(self.connection.send_config_file, config_file, delay_factor, incremental, dry_run)
+
+
+class AsyncioSessions(AsyncSessions):
+    """
+    Manager of device connections consumed from an asyncio event loop\n
+    Same attributes and output format as AsyncSessions. Function may be a regular function, which receives a
+    Connection, or an 'async def' coroutine function, which receives an AsyncConnection.\n
+    Netmiko transports are blocking, so sessions run on the AsyncSessions thread pool and the event loop only awaits
+    their results. This does not remove the thread per session cost: each concurrent session occupies one thread for
+    its whole connect, function and disconnect, so concurrency should stay in the range of AsyncSessions threads.
+
+    :param username: Device management username
+    :param password: Device management password
+    :param mgmt_ips: Management IP addresses for devices
+    :param function: Function or coroutine function to run on each device
+    :param enable_pw: Devices' Enable Password
+    :param verbose: Bool to print progress to screen
+    :param concurrency: Max number of concurrent device sessions
+    :param hooks: List of MetricsHook receiving per device timings and run report
+    :param sink: ResultSink full device results are written to, devices are kept in memory as DeviceRecords and
+        outputs is the sink
+    :param checkpoint: Checkpoint journaling each finished device result
+    :param resume: Bool to only run devices not already finished in checkpoint, journaled results are included in
+        outputs
+    :param run: Bool to run sessions on init; if False, await run() or iterate stream() within an event loop
+    :param session_args: Additional AsyncSessions.stream arguments (prescan, scheduler, output_store, etc.)
+    """
+    def __init__(self, username, password, mgmt_ips, function, enable_pw='', verbose=False, concurrency=100, hooks=(),
+                 sink=None, checkpoint=None, resume=False, run=True, **session_args):
+        self.successful_devices = []
+        """List of devices successfully connected"""
+        self.failed_devices = []
+        """List of failed that failed connectivity checks"""
+        self.outputs = [] if sink is None else sink
+        """List of dictionaries containing device info and function output"""
+        self.report = RunReport(hooks, keep_devices=sink is None)
+        """RunReport of per device phase timings, only aggregates are kept with a sink"""
+        self.sink = sink
+        self.checkpoint = checkpoint
+
+        try:
+            if len(mgmt_ips) == 0:
+                raise InputError('No Management IP Addresses found')
+        except TypeError:
+            raise InputError('No Management IP Addresses found')
+
+        self.mgmt_ips = mgmt_ips
+        self.function = function
+        self.concurrency = concurrency
+        self.resume_checkpoint = resume
+        self.session_args = dict(
+            session_args, username=username, password=password, enable_pw=enable_pw, verbose=verbose
+        )
+        """AsyncSessions.stream arguments shared by all devices"""
+
+        if run:
+            asyncio.run(self.run())
+
+    async def run(self):
+        """Runs function against all management IP addresses"""
+        mgmt_ips = self.mgmt_ips
+        try:
+            if self.checkpoint is not None:
+                self.mgmt_ips = self.resume(mgmt_ips, self.resume_checkpoint)
+                if len(self.mgmt_ips) == 0:
+                    self.report.complete()
+                    return
+            async for result in self.stream():
+                self.collect(result)
+        finally:
+            self.mgmt_ips = mgmt_ips
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+
+    async def stream(self):
+        """
+        Async generator yielding each device result as soon as its session completes\n
+        Results have the same format as AsyncSessions.stream()
+        """
+        loop = asyncio.get_running_loop()
+        function = self.function
+        if iscoroutinefunction(function):
+            function = partial(run_coroutine, function, loop)
+        results = AsyncSessions.stream(
+            mgmt_ips=self.mgmt_ips, function=function, threads=self.concurrency, report=self.report,
+            **self.session_args
+        )
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, results, None)
+                if result is None:
+                    break
+                yield result
+        finally:
+            await loop.run_in_executor(None, results.close)
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from threading import Lock
+
+
+class FingerprintCache:
+    """
+    Persistent cache of device fingerprints keyed by management IP address\n
+    Fingerprints let Connection skip device type autodetection and the privilege probe on later runs.\n
+    Example fingerprint:
+        {
+            'device_type': 'cisco_ios',\n
+            'con_type': 'SSH',\n
+            'enable': False,\n
+            'privileged': True,\n
+            'timestamp': 1633046400.0\n
+        }
+
+    :param path: Location of cache .json file
+    :param ttl: Seconds before a fingerprint expires
+    :param max_entries: Max number of fingerprints kept, oldest fingerprints are evicted first
+    """
+    def __init__(self, path='fingerprint_cache.json', ttl=86400, max_entries=100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fingerprints = {}
+        """Dictionary of fingerprints keyed by management IP address"""
+        self.lock = Lock()
+        if os.path.exists(path):
+            try:
+                with open(path) as file:
+                    self.fingerprints = json.load(file)
+            except (ValueError, OSError):
+                self.fingerprints = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def fresh(self, fingerprint):
+        """
+        :param fingerprint: Fingerprint dictionary
+        :return: Bool if fingerprint has not expired
+        """
+        return time.time() - fingerprint['timestamp'] < self.ttl
+
+    def get(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        :return: Fingerprint dictionary or None if missing or expired
+        """
+        with self.lock:
+            fingerprint = self.fingerprints.get(ip_address)
+            if fingerprint is None:
+                return None
+            elif not self.fresh(fingerprint):
+                del self.fingerprints[ip_address]
+                return None
+            return dict(fingerprint)
+
+    def set(self, ip_address, device_type, con_type, enable, privileged):
+        """
+        :param ip_address: Management IP address of device
+        :param device_type: Netmiko device type
+        :param con_type: 'SSH' or 'TELNET'
+        :param enable: Bool if device requires enable password
+        :param privileged: Bool if privileged access on device
+        """
+        with self.lock:
+            self.fingerprints[ip_address] = {
+                'device_type': device_type,
+                'con_type': con_type,
+                'enable': enable,
+                'privileged': privileged,
+                'timestamp': time.time()
+            }
+
+    def evict(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        """
+        with self.lock:
+            self.fingerprints.pop(ip_address, None)
+
+    def save(self):
+        """Evicts expired and excess fingerprints and writes cache to file"""
+        with self.lock:
+            self.fingerprints = {
+                ip_address: fingerprint for ip_address, fingerprint in self.fingerprints.items()
+                if self.fresh(fingerprint)
+            }
+            if len(self.fingerprints) > self.max_entries:
+                newest = sorted(
+                    self.fingerprints.items(), key=lambda item: item[1]['timestamp'], reverse=True
+                )[:self.max_entries]
+                self.fingerprints = dict(newest)
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(self.fingerprints, file)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,123 @@
+import json
+import os
+import zlib
+from hashlib import sha256
+from threading import Lock, get_ident
+
+
+class OutputStore:
+    """
+    Persistent content hashes of device outputs from the previous run, used to mark results changed or unchanged\n
+    Outputs are hashed per management IP address and command: outputs of send_commands (dictionaries) are hashed per
+    key, other outputs under 'output'. With store_outputs, outputs are also kept as zlib compressed blobs named by
+    their SHA-256 hash, so identical outputs of thousands of devices are stored once. Devices that fail keep their
+    previous hashes. Blobs referenced by neither this nor the previous run are deleted on save.\n
+    Layout:
+        path/index.json: {ip_address: {command: hash}}\n
+        path/blobs/ab/cdef...: Compressed JSON output with hash abcdef...
+
+    :param path: Directory of index and blobs
+    :param store_outputs: Bool to keep compressed outputs of the last run, otherwise only hashes are kept
+    :param compression_level: zlib compression level of blobs
+    """
+    def __init__(self, path='outputs', store_outputs=True, compression_level=6):
+        self.path = path
+        self.store_outputs = store_outputs
+        self.compression_level = compression_level
+        self.previous_hashes = {}
+        """Dictionary of previous run's output hashes keyed by management IP address and command"""
+        self.hashes = {}
+        """Dictionary of this run's output hashes keyed by management IP address and command"""
+        self.lock = Lock()
+        try:
+            with open(os.path.join(path, 'index.json')) as file:
+                self.previous_hashes = json.load(file)
+        except (ValueError, OSError):
+            self.previous_hashes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def blob_path(self, digest):
+        """
+        :param digest: SHA-256 hex digest of output
+        :return: Location of compressed output
+        """
+        return os.path.join(self.path, 'blobs', digest[:2], digest[2:])
+
+    def put(self, digest, data):
+        """
+        Writes compressed output unless an identical output is already stored
+
+        :param digest: SHA-256 hex digest of data
+        :param data: Serialized output
+        """
+        blob_path = self.blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = f'{blob_path}.{os.getpid()}.{get_ident()}.tmp'
+            with open(temp_path, 'wb') as file:
+                file.write(zlib.compress(data, self.compression_level))
+            os.replace(temp_path, blob_path)
+
+    def changed(self, ip_address, output):
+        """
+        Records output of device and compares it with the previous run
+
+        :param ip_address: Management IP address of device
+        :param output: Function output of device
+        :return: Bool if output differs from previous run or device has no previous output
+        """
+        outputs = output if isinstance(output, dict) else {'output': output}
+        hashes = {}
+        for command, command_output in outputs.items():
+            data = json.dumps(command_output, sort_keys=True, default=str).encode()
+            digest = hashes[str(command)] = sha256(data).hexdigest()
+            if self.store_outputs:
+                self.put(digest, data)
+        with self.lock:
+            self.hashes[ip_address] = hashes
+        return hashes != self.previous_hashes.get(ip_address)
+
+    def previous(self, ip_address, command='output'):
+        """
+        :param ip_address: Management IP address of device
+        :param command: Command of send_commands output, 'output' for other outputs
+        :return: Output of previous run or None if not stored
+        """
+        digest = self.previous_hashes.get(ip_address, {}).get(command)
+        if digest is None:
+            return None
+        try:
+            with open(self.blob_path(digest), 'rb') as file:
+                return json.loads(zlib.decompress(file.read()))
+        except OSError:
+            return None
+
+    def save(self):
+        """
+        Writes index of this run's hashes, devices without output this run keep their previous hashes, and deletes
+        blobs referenced by neither run, so previous() still returns outputs of changed devices after the run. Blobs
+        of the previous run are collected on the save of the next run.
+        """
+        with self.lock:
+            index = {**self.previous_hashes, **self.hashes}
+            os.makedirs(self.path, exist_ok=True)
+            temp_path = os.path.join(self.path, 'index.json.tmp')
+            with open(temp_path, 'w') as file:
+                json.dump(index, file)
+            os.replace(temp_path, os.path.join(self.path, 'index.json'))
+            referenced = {
+                digest for hashes in (*index.values(), *self.previous_hashes.values()) for digest in hashes.values()
+            }
+            blobs = os.path.join(self.path, 'blobs')
+            if os.path.isdir(blobs):
+                for prefix in os.listdir(blobs):
+                    for name in os.listdir(os.path.join(blobs, prefix)):
+                        if prefix + name not in referenced or not self.store_outputs:
+                            os.remove(os.path.join(blobs, prefix, name))
+                    if not os.listdir(os.path.join(blobs, prefix)):
+                        os.rmdir(os.path.join(blobs, prefix))
@@ -0,0 +1,98 @@
+import json
+import os
+from threading import Lock
+from time import monotonic
+
+
+class Checkpoint:
+    """
+    Append only JSONL journal of finished device results used to resume interrupted runs\n
+    Results are buffered and flushed to disk with fsync every fsync_every results or fsync_interval seconds, so at
+    most that many devices are run again after a crash. Outputs that are not JSON serializable are journaled with
+    str(). A partially written last line is discarded on resume.
+
+    :param path: Path of journal
+    :param fsync_every: Number of results written between fsyncs
+    :param fsync_interval: Max seconds between fsyncs
+    :param retry_failed: Bool to run failed devices again on resume
+    """
+    def __init__(self, path='checkpoint.jsonl', fsync_every=100, fsync_interval=5, retry_failed=False):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.retry_failed = retry_failed
+        self.file = None
+        self.pending = 0
+        self.last_sync = monotonic()
+        self.lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self, resume=False):
+        """
+        Opens journal for writing
+
+        :param resume: Bool to keep journaled results, otherwise journal is truncated
+        :return: Dictionary of finished device results keyed by management IP address
+        """
+        finished = {}
+        size = 0
+        if resume:
+            try:
+                with open(self.path, 'rb') as file:
+                    for line in file:
+                        try:
+                            result = json.loads(line)
+                        except ValueError:
+                            break
+                        if not line.endswith(b'\n'):
+                            break
+                        finished[result['device']['ip_address']] = result
+                        size += len(line)
+            except FileNotFoundError:
+                pass
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            self.file = open(self.path, 'ab')
+            self.file.truncate(size)
+            self.pending = 0
+            self.last_sync = monotonic()
+        if self.retry_failed:
+            return {ip_address: result for ip_address, result in finished.items() if result['successful']}
+        return finished
+
+    def write(self, result):
+        """
+        :param result: Device result (see AsyncSessions.stream)
+        """
+        line = json.dumps(result, default=str).encode() + b'\n'
+        with self.lock:
+            self.file.write(line)
+            self.pending += 1
+            if self.pending >= self.fsync_every or monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        """Flushes buffered results and fsyncs journal"""
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        if self.file is not None and self.pending > 0:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = monotonic()
+
+    def close(self):
+        """Syncs and closes journal"""
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+                self.file.close()
+                self.file = None
@@ -0,0 +1,117 @@
+import re
+
+IGNORED_LINES = re.compile(
+    r'^(!|end$|exit$|Building configuration|Current configuration|Last configuration change|NVRAM config last|$)'
+)
+"""Running config headers, comments and mode navigation that never need to be pushed"""
+
+BANNER = re.compile(r'^(banner \S+) (\^C|\S)(.*)$')
+"""Banner type, delimiter and text on first line of banner"""
+
+BLOCK_COMMANDS = re.compile(
+    r'^(interface|router|line|vlan \d|vrf definition|ip vrf|ip access-list|ipv6 access-list|route-map|policy-map|'
+    r'class-map|controller|crypto (map|isakmp policy|pki trustpoint)|key chain|ip dhcp pool|object-group|'
+    r'aaa group server|track|template|spanning-tree mst configuration|address-family) '
+)
+"""Commands entering a config mode whose following lines belong to it"""
+
+
+def normalize(line):
+    """
+    :param line: Config line
+    :return: Config line without indentation or repeated white space
+    """
+    return ' '.join(line.split())
+
+
+def config_tree(config):
+    """
+    Parses IOS style config into a hierarchy using indentation\n
+    Banners are kept as one node so their text lines are not mistaken for commands.
+
+    :param config: Config string or iterable of lines
+    :return: Dictionary keyed by normalized line of tuples of original lines and child dictionary
+    """
+    if isinstance(config, str):
+        config = config.splitlines()
+    tree = {}
+    stack = [(-1, tree)]
+    lines = iter(config)
+    for line in lines:
+        line = line.rstrip('\r\n')
+        key = normalize(line)
+        if IGNORED_LINES.match(key):
+            continue
+        indent = len(line) - len(line.lstrip())
+        while stack[-1][0] >= indent:
+            stack.pop()
+        block = [line]
+        banner = BANNER.match(key)
+        if banner:
+            # Banner text runs until the closing delimiter, '^C' in running config
+            name, delimiter, body = banner.groups()
+            while delimiter not in body:
+                try:
+                    text = next(lines).rstrip('\r\n')
+                except StopIteration:
+                    break
+                block.append(text)
+                body += '\n' + text
+            key = f'{name}\n{body.split(delimiter)[0].strip()}'
+        children = {}
+        stack[-1][1][key] = (block, children)
+        stack.append((indent, children))
+    return tree
+
+
+def tree_diff(running, candidate):
+    """
+    :param running: Running config dictionary (see config_tree)
+    :param candidate: Candidate config dictionary (see config_tree)
+    :return: List of candidate lines missing from running config, with the parents of missing child lines
+    """
+    lines = []
+    for key, (block, children) in candidate.items():
+        if key in running:
+            child_lines = tree_diff(running[key][1], children)
+            if child_lines:
+                lines.extend(block)
+                lines.extend(child_lines)
+        else:
+            lines.extend(block)
+            lines.extend(tree_diff({}, children))
+    return lines
+
+
+def flat(running, candidate):
+    """
+    :param running: Running config dictionary (see config_tree)
+    :param candidate: Candidate config dictionary (see config_tree)
+    :return: Bool if candidate has an unindented block command followed by other lines, whose child lines can not
+        be told apart from global lines
+    """
+    keys = list(candidate)
+    for key in keys[:-1]:
+        if not candidate[key][1] and (BLOCK_COMMANDS.match(key) or (key in running and running[key][1])):
+            return True
+    return False
+
+
+def config_diff(running_config, candidate):
+    """
+    Computes the config lines that must be sent for running config to include candidate config\n
+    Lines already configured are dropped and changed lines are sent as they replace the configured value. 'no' lines
+    are sent unless running config shows the same 'no' line, as running config hides default commands they may
+    disable. Child lines are sent under their parent.\n
+    Candidate child lines must be indented under their parent as in running config. A candidate with unindented block
+    commands (interface, router, etc.) followed by other lines is returned in full, as a normal push would send it.
+
+    :param running_config: Output of 'show running-config'
+    :param candidate: Config string or list of config lines to push
+    :return: List of config lines to send, empty if running config already includes candidate
+    """
+    running = config_tree(running_config)
+    candidate = config_tree(candidate)
+    if flat(running, candidate):
+        return tree_diff({}, candidate)
+    return tree_diff(running, candidate)
@@ -1,31 +1,52 @@
-import os
-import sys
-from multiprocessing.dummy import Pool
-from netmiko import ConnectHandler, ssh_exception, SSHDetect
-from net_async.exceptions import TemplatesNotFoundWithinPackage, MissingArgument, InputError, ForceSessionRetry, \
-    NoConfigPriv
-from textfsm.parser import TextFSMError
+import re
+from net_async.config_diff import config_diff
+from net_async.exceptions import MissingArgument, InputError, ForceSessionRetry, NoConfigPriv
+from net_async.latency import NETMIKO_LOOP_DELAY, NETMIKO_READ_TIMEOUT, max_loops
+from net_async.parsing import parse_output, template_path
+from net_async.metrics import RunReport
+from net_async.prescan import reachability_scan
+from net_async.retry import RetryPolicy
 from threading import Semaphore
 from logging import basicConfig, exception
+from time import perf_counter, monotonic, sleep
+from contextlib import contextmanager
 import encodings.idna
 
-basicConfig(filename='error_log.txt')
-
-# Checks for TextFSM templates within single file bundle if code is frozen
-if getattr(sys, 'frozen', False):
-    os.environ['NET_TEXTFSM'] = sys._MEIPASS
-else:
-    for path in sys.path:
-        if path.__contains__('site-packages'):
-            if os.path.exists(f'{path}/net_async/templates'):
-                os.environ['NET_TEXTFSM'] = f'{path}/net_async/templates'
-            elif os.path.exists('./net_async/templates'):
-                os.environ['NET_TEXTFSM'] = './net_async/templates'
-            elif os.path.exists('./templates'):
-                os.environ['NET_TEXTFSM'] = './templates'
-            else:
-                raise TemplatesNotFoundWithinPackage
-            break
+_configured = False
+
+
+def configure():
+    """
+    Configures error log and TextFSM templates on first Connection instead of at import, later calls return
+    immediately
+    """
+    global _configured
+    if not _configured:
+        basicConfig(filename='error_log.txt')
+        template_path()
+        _configured = True
+
+
+DEFAULT_DELAY_FACTOR = 60
+"""netmiko delay_factor used when no LatencyTracker or override is provided"""
+
+PRIVILEGE_CHECKS = ('show_run', 'show_privilege', 'lazy', 'disabled')
+"""
+Privilege detection strategies for Connection\n
+show_run: 'show run' must not return 'Invalid input detected' (Default)\n
+show_privilege: 'show privilege' must return privilege level 15\n
+lazy: 'show privilege' runs only on the first send_config_set or send_config_file\n
+disabled: No probe, device is assumed privileged
+"""
+
+INVENTORY_MODES = ('standard', 'lazy', 'full')
+"""
+Inventory collection modes for Connection, inventory attributes are always parsed on first access\n
+standard: Device results include model, rommon, software_version and serial (Default)\n
+lazy: Device results only include inventory known without sending commands, e.g. NX-OS model and serial are empty
+unless accessed by function\n
+full: 'show inventory' and stack members are collected during setup and included in device results
+"""
 
 
 class Connection:
@@ -35,6 +56,9 @@ class Connection:
         return self
 
     def __init__(self, **kwargs):
+        from netmiko import ConnectHandler, ssh_exception, SSHDetect
+        configure()
+
         def arg(value):
             try:
                 return kwargs[value]
@@ -53,6 +77,51 @@ class Connection:
             enable_pw = arg('enable_pw')
         except MissingArgument:
             enable_pw = ''
+        try:
+            fingerprint_cache = arg('fingerprint_cache')
+        except MissingArgument:
+            fingerprint_cache = None
+        try:
+            privilege_check = arg('privilege_check')
+        except MissingArgument:
+            privilege_check = 'show_run'
+        if privilege_check not in PRIVILEGE_CHECKS:
+            raise InputError(f'privilege_check must be one of {PRIVILEGE_CHECKS}')
+        try:
+            self.latency_tracker = arg('latency_tracker')
+        except MissingArgument:
+            self.latency_tracker = None
+        self.timeout_errors = (OSError, ssh_exception.NetmikoTimeoutException)
+        """Exceptions of netmiko reads that timed out"""
+        try:
+            self.parse = arg('parser').parse
+        except MissingArgument:
+            self.parse = parse_output
+        try:
+            transport = arg('transport')
+        except MissingArgument:
+            transport = 'SSH'
+        try:
+            fingerprint = arg('fingerprint')
+        except MissingArgument:
+            fingerprint = None
+        try:
+            ssh_port = arg('ssh_port')
+        except MissingArgument:
+            ssh_port = 22
+        try:
+            telnet_port = arg('telnet_port')
+        except MissingArgument:
+            telnet_port = 23
+        try:
+            self.inventory_mode = arg('inventory')
+        except MissingArgument:
+            self.inventory_mode = 'standard'
+        if self.inventory_mode not in INVENTORY_MODES:
+            raise InputError(f'inventory must be one of {INVENTORY_MODES}')
+        self.timings = {}
+        """Dictionary of seconds spent per phase (see RunReport)"""
+        start = perf_counter()
         self.ip_address = arg('ip_address')
         username = arg('username')
         password = arg('password')
@@ -64,61 +133,67 @@ class Connection:
         self.privileged = False
         self.session = None
         self.enable = enable
+        self.enable_pw = enable_pw
         self.devicetype = devicetype
+        self.privilege_check = privilege_check
+        self.privilege_check_time = 0.0
+        """Seconds spent probing device privilege level"""
+        self.setup_time = 0.0
+        """Seconds spent connecting to and probing device"""
         self.device = {
             'device_type': self.devicetype,
             'ip': self.ip_address,
             'username': username,
-            'password': password
+            'password': password,
+            'port': ssh_port
         }
         if self.enable:
             self.device['secret'] = enable_pw
         self.session = None
         self.hostname = ''
-        self.software_version = ''
-        self.model = ''
-        self.serial = ''
-        self.rommon_version = ''
+        self.showver = None
+        """TextFSM 'show version' output inventory attributes are parsed from"""
+        self.inventory_cache = None
+        self.inventory_items = None
+        """TextFSM 'show inventory' output, collected on first access of NX-OS model or serial or in full mode"""
 
-        # TODO: Add full 'show inventory' inventory and switch stack inventory from multiple entries in show version
-
-        def inventory(showver):
+        def assumed_privilege(fingerprint):
             """
-            :param showver: TextFSM 'show version' output
-            :return: Sets device inventory attributes
+            :param fingerprint: Cached fingerprint or None
+            :return: Bool if privileged attribute was set without probing device
             """
-            if self.devicetype.__contains__('cisco_ios'):
-                self.software_version = showver[0]['version']
-                self.rommon_version = showver[0]['rommon']
-                self.model = showver[0]['hardware'][0]
-                self.serial = showver[0]['serial'][0]
-            elif self.devicetype == 'cisco_nxos':
-                self.software_version = showver[0]['os']
-                sh_inv = self.send_command('show inventory')
-                for x in sh_inv:
-                    if x['name'] == 'Chassis':
-                        self.serial = x['sn']
-                        self.model = x['pid']
-                        break
+            if fingerprint is not None:
+                self.privileged = fingerprint['privileged']
+            elif self.privilege_check == 'lazy':
+                self.privileged = None
+            elif self.privilege_check == 'disabled':
+                self.privileged = True
+            else:
+                return False
+            return True
 
-        def device_check(device):
+        def device_check(device, fingerprint=None):
             """
             :param device: Device dictionary (self.device)
+            :param fingerprint: Cached fingerprint used instead of the privilege probe
             :return: Sets device connectivity attributes
             """
             while True:
                 if self.enable:
-                    self.session = ConnectHandler(**device)
-                    self.session.enable()
+                    with self.timed('connect'):
+                        self.session = ConnectHandler(**device)
+                    with self.timed('enable'):
+                        self.session.enable()
                     showver = self.send_command('show version')
                     if not showver.__contains__('Failed'):
                         self.authorization = True
                         self.hostname = showver[0]['hostname']
-                        if not self.send_command('show run').__contains__('Invalid input detected'):
-                            self.privileged = True
+                        if not assumed_privilege(fingerprint):
+                            self.privileged = self.check_privilege()
                     break
                 else:
-                    self.session = ConnectHandler(**device)
+                    with self.timed('connect'):
+                        self.session = ConnectHandler(**device)
                     showver = self.send_command('show version')
                     if 'Failed' in showver:
                         break
@@ -127,133 +202,742 @@ class Connection:
                         self.authorization = True
                         self.privileged = True
                         self.hostname = showver[0]['system_name']
-                        inventory(showver)
+                        self.showver = showver
                         break
                     else:
                         self.authorization = True
                         self.hostname = showver[0]['hostname']
-                        inventory(showver)
-                        if self.send_command('show run').__contains__('Invalid input detected'):
+                        self.showver = showver
+                        if assumed_privilege(fingerprint):
+                            pass
+                        elif self.check_privilege():
+                            self.privileged = True
+                        else:
                             self.enable = True
                             self.device['secret'] = enable_pw
                             self.session.disconnect()
-                        else:
-                            self.privileged = True
                         break
 
-        try:
+        def reset():
+            """Resets connectivity attributes after a failed cached fingerprint"""
+            if self.session is not None:
+                try:
+                    self.session.disconnect()
+                except Exception:
+                    pass
+            self.session = None
+            self.con_type = None
+            self.connectivity = False
+            self.authentication = False
+            self.authorization = False
+            self.privileged = False
+            self.enable = enable
+            self.device.pop('secret', None)
+            if self.enable:
+                self.device['secret'] = enable_pw
+
+        if fingerprint is None and fingerprint_cache is not None:
+            fingerprint = fingerprint_cache.get(self.ip_address)
+
+        # Skips autodetect and privilege probe when device was fingerprinted on a previous run or attempt
+        if fingerprint is not None:
+            try:
+                self.device['device_type'] = fingerprint['device_type']
+                self.devicetype = fingerprint['device_type']
+                if fingerprint['con_type'] == 'TELNET':
+                    self.device['port'] = telnet_port
+                    self.device['secret'] = password
+                if fingerprint['enable']:
+                    self.enable = True
+                    self.device['secret'] = enable_pw
+                device_check(self.device, fingerprint)
+                if not self.authorization:
+                    raise ValueError('Cached fingerprint not authorized')
+                self.authentication = True
+                self.connectivity = True
+                self.con_type = fingerprint['con_type']
+            except Exception:
+                reset()
+                if fingerprint_cache is not None:
+                    fingerprint_cache.evict(self.ip_address)
+                fingerprint = None
+
+        if fingerprint is None:
+            self.device['port'] = ssh_port
             try:
-                autodetect = SSHDetect(**self.device).autodetect()
-                self.device['device_type'] = autodetect
-                self.devicetype = autodetect
-                device_check(self.device)
-            except (ValueError, EOFError):
                 try:
-                    self.device['device_type'] = 'cisco_ios'
-                    self.devicetype = 'cisco_ios'
+                    # Pre-scan found SSH port closed, go straight to TELNET
+                    if transport == 'TELNET':
+                        raise ConnectionRefusedError('SSH port closed')
+                    with self.timed('autodetect'):
+                        autodetect = SSHDetect(**self.device).autodetect()
+                    self.device['device_type'] = autodetect
+                    self.devicetype = autodetect
                     device_check(self.device)
                 except (ValueError, EOFError):
-                    self.device['device_type'] = 'cisco_ios'
-                    self.devicetype = 'cisco_ios'
-                    device_check(self.device)
-            self.authentication = True
-            self.connectivity = True
-            self.con_type = 'SSH'
-        except (ConnectionRefusedError, ValueError, ssh_exception.NetmikoAuthenticationException,
-                ssh_exception.NetmikoTimeoutException, ssh_exception.SSHException):
-            try:
+                    try:
+                        self.device['device_type'] = 'cisco_ios'
+                        self.devicetype = 'cisco_ios'
+                        device_check(self.device)
+                    except (ValueError, EOFError):
+                        self.device['device_type'] = 'cisco_ios'
+                        self.devicetype = 'cisco_ios'
+                        device_check(self.device)
+                self.authentication = True
+                self.connectivity = True
+                self.con_type = 'SSH'
+            except (ConnectionRefusedError, ValueError, ssh_exception.NetmikoAuthenticationException,
+                    ssh_exception.NetmikoTimeoutException, ssh_exception.SSHException):
                 try:
-                    self.device['device_type'] = 'cisco_ios_telnet'
-                    self.devicetype = 'cisco_ios_telnet'
-                    self.device['secret'] = password
-                    device_check(self.device)
-                    self.authentication = True
-                    self.connectivity = True
-                    self.con_type = 'TELNET'
+                    try:
+                        self.device['device_type'] = 'cisco_ios_telnet'
+                        self.device['port'] = telnet_port
+                        self.devicetype = 'cisco_ios_telnet'
+                        self.device['secret'] = password
+                        device_check(self.device)
+                        self.authentication = True
+                        self.connectivity = True
+                        self.con_type = 'TELNET'
+                    except ssh_exception.NetmikoAuthenticationException:
+                        self.device['device_type'] = 'cisco_ios_telnet'
+                        self.device['port'] = telnet_port
+                        self.devicetype = 'cisco_ios_telnet'
+                        self.device['secret'] = password
+                        device_check(self.device)
+                        self.authentication = True
+                        self.connectivity = True
+                        self.con_type = 'TELNET'
                 except ssh_exception.NetmikoAuthenticationException:
-                    self.device['device_type'] = 'cisco_ios_telnet'
-                    self.devicetype = 'cisco_ios_telnet'
-                    self.device['secret'] = password
-                    device_check(self.device)
-                    self.authentication = True
                     self.connectivity = True
-                    self.con_type = 'TELNET'
-            except ssh_exception.NetmikoAuthenticationException:
-                self.connectivity = True
-                self.exception = 'NetmikoAuthenticationException'
-            except ssh_exception.NetmikoTimeoutException:
-                self.exception = 'NetmikoTimeoutException'
-            except ConnectionRefusedError:
-                self.exception = 'ConnectionRefusedError'
-            except ValueError:
-                self.exception = 'ValueError'
-            except TimeoutError:
-                self.exception = 'TimeoutError'
+                    self.exception = 'NetmikoAuthenticationException'
+                except ssh_exception.NetmikoTimeoutException:
+                    self.exception = 'NetmikoTimeoutException'
+                except ConnectionRefusedError:
+                    self.exception = 'ConnectionRefusedError'
+                except ValueError:
+                    self.exception = 'ValueError'
+                except TimeoutError:
+                    self.exception = 'TimeoutError'
+                except ConnectionResetError:
+                    self.exception = 'ConnectionResetError'
+            except OSError:
+                self.exception = 'OSError'
             except ConnectionResetError:
                 self.exception = 'ConnectionResetError'
-        except OSError:
-            self.exception = 'OSError'
-        except ConnectionResetError:
-            self.exception = 'ConnectionResetError'
-        except Exception as e:
-            exception(e)
+            except Exception as e:
+                exception(e)
+
+            if fingerprint_cache is not None and self.authorization and self.con_type is not None:
+                fingerprint_cache.set(self.ip_address, **self.fingerprint())
+
+        if self.inventory_mode == 'full' and self.authorization:
+            self.show_inventory()
+
+        self.setup_time = perf_counter() - start
+        self.timings['setup'] = self.setup_time
+
+    def fingerprint(self):
+        """
+        :return: Dictionary of learned device type, connection type and privilege level (see FingerprintCache)
+        """
+        return {
+            'device_type': self.devicetype,
+            'con_type': self.con_type,
+            'enable': self.enable,
+            'privileged': self.privileged
+        }
+
+    def inventory(self, fetch=True):
+        """
+        Parses device inventory from 'show version' on first call, NX-OS model and serial are parsed from
+        'show inventory'
+
+        :param fetch: Bool to send 'show inventory' if needed, otherwise its attributes are empty until fetched
+        :return: Dictionary of software_version, rommon_version, model and serial
+        """
+        if self.inventory_cache is not None:
+            return self.inventory_cache
+        inventory = {
+            'software_version': '',
+            'rommon_version': '',
+            'model': '',
+            'serial': ''
+        }
+        showver = self.showver
+        if isinstance(showver, list) and len(showver) > 0 and isinstance(showver[0], dict):
+            # Templates of other platforms (e.g. NX-OS reached over TELNET) leave fields missing or empty
+            if self.devicetype.__contains__('cisco_ios'):
+                inventory['software_version'] = showver[0].get('version') or ''
+                inventory['rommon_version'] = showver[0].get('rommon') or ''
+                inventory['model'] = first(showver[0].get('hardware'))
+                inventory['serial'] = first(showver[0].get('serial'))
+            elif self.devicetype == 'cisco_nxos':
+                inventory['software_version'] = showver[0].get('os') or ''
+                if self.inventory_items is None and not fetch:
+                    return inventory
+                for x in self.show_inventory():
+                    if isinstance(x, dict) and x.get('name') == 'Chassis':
+                        inventory['serial'] = x.get('sn') or ''
+                        inventory['model'] = x.get('pid') or ''
+                        break
+        self.inventory_cache = inventory
+        return inventory
+
+    def show_inventory(self):
+        """
+        :return: TextFSM 'show inventory' output, sent on first call
+        """
+        if self.inventory_items is None:
+            sh_inv = self.send_command('show inventory')
+            self.inventory_items = sh_inv if isinstance(sh_inv, list) else []
+        return self.inventory_items
+
+    def stack_members(self):
+        """
+        :return: List of model and serial of each switch stack member from 'show version'
+        """
+        showver = self.showver
+        if not isinstance(showver, list) or len(showver) == 0 or not isinstance(showver[0], dict) or \
+                not self.devicetype.__contains__('cisco_ios'):
+            return []
+        return [
+            {
+                'model': model,
+                'serial': serial
+            } for model, serial in zip(showver[0].get('hardware') or [], showver[0].get('serial') or [])
+        ]
+
+    @property
+    def software_version(self):
+        return self.inventory()['software_version']
 
-    def send_command(self, command):
+    @property
+    def rommon_version(self):
+        return self.inventory()['rommon_version']
+
+    @property
+    def model(self):
+        return self.inventory()['model']
+
+    @property
+    def serial(self):
+        return self.inventory()['serial']
+
+    @contextmanager
+    def timed(self, phase):
+        """
+        Context manager adding seconds spent within it to timings
+
+        :param phase: Phase name
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + perf_counter() - start
+
+    def check_privilege(self):
+        """
+        :return: Bool if privileged access on device
+        """
+        with self.timed('privilege_check'):
+            if self.privilege_check == 'show_run':
+                privileged = not self.send_command('show run').__contains__('Invalid input detected')
+            else:
+                output = str(self.send_command('show privilege'))
+                level = re.search(r'privilege level\D*(\d+)', output, re.IGNORECASE)
+                if level is None:
+                    privileged = not self.send_command('show run').__contains__('Invalid input detected')
+                else:
+                    privileged = level.group(1) == '15'
+        self.privilege_check_time = self.timings['privilege_check']
+        return privileged
+
+    def has_privilege(self):
+        """
+        Runs deferred privilege check on first configuration attempt when privilege_check is 'lazy'
+
+        :return: Bool if privileged access on device
+        """
+        if self.privileged is None:
+            self.privileged = self.check_privilege()
+            if not self.privileged and self.enable_pw != '':
+                self.session.secret = self.enable_pw
+                with self.timed('enable'):
+                    self.session.enable()
+                self.enable = True
+                self.privileged = self.check_privilege()
+        return self.privileged
+
+    def timed_send(self, key, send, delay_factor=None, resend=False):
+        """
+        Runs netmiko send method with read timeout learned by LatencyTracker if provided\n
+        Timed out reads are recorded by the tracker. If resend, a timed out send is resent once with the tracker's
+        longer timeout after clearing the channel. Only single show commands are resent, config sets and pipelined
+        commands are never replayed.
+
+        :param key: Command or command key latency is recorded under
+        :param send: Function accepting netmiko delay_factor and max_loops keyword arguments that sends to device
+        :param delay_factor: delay_factor override for this call
+        :param resend: Bool if send is a single read safe to repeat
+        :return: Output of send
+        """
+        if delay_factor is not None:
+            return send(delay_factor=delay_factor)
+        elif self.latency_tracker is None:
+            return send(delay_factor=DEFAULT_DELAY_FACTOR)
+        timeout = self.latency_tracker.timeout(self.ip_address, key)
+        while True:
+            start = perf_counter()
+            try:
+                output = send(delay_factor=1, max_loops=max_loops(timeout))
+                break
+            except self.timeout_errors:
+                next_timeout = self.latency_tracker.record_timeout(self.ip_address, key, timeout)
+                if not resend or next_timeout <= timeout:
+                    raise
+                resend = False
+                timeout = next_timeout
+                # Late output of the timed out command would otherwise be read as output of the resend
+                self.session.clear_buffer()
+        self.latency_tracker.record(self.ip_address, key, perf_counter() - start)
+        return output
+
+    def send_command(self, command, delay_factor=None):
         """
         :param command: Command to run
+        :param delay_factor: delay_factor override, otherwise read timeout learned by LatencyTracker or delay_factor 60
         :return: Output of command
         """
         if self.session is None:
             pass
         else:
-            try:
-                return self.session.send_command(command, delay_factor=60, use_textfsm=True)
-            except TextFSMError:
-                return self.session.send_command(command, delay_factor=60)
+            with self.timed(f'command:{command}'):
+                raw_output = self.timed_send(
+                    command, lambda **read: self.session.send_command(command, **read), delay_factor, resend=True
+                )
+            with self.timed('parse'):
+                return self.parse(self.session.device_type, command, raw_output)
+
+    def send_commands(self, commands, pipeline=False, delay_factor=None):
+        """
+        Sends multiple commands over the session's channel and parses each raw output once
+
+        :param commands: List of commands to run
+        :param pipeline: Bool to write all commands at once and split output on device prompt instead of waiting
+            for each command to complete before sending the next
+        :param delay_factor: delay_factor override, otherwise read timeout learned by LatencyTracker or delay_factor 60
+        :return: Dictionary of output keyed by command
+        """
+        if self.session is None:
+            pass
+        elif pipeline:
+            with self.timed('command:pipeline'):
+                raw_outputs = self.timed_send(
+                    'pipeline', lambda **read: self.pipeline_commands(commands, **read), delay_factor
+                )
+            with self.timed('parse'):
+                return {
+                    command: self.parse(self.session.device_type, command, raw_output)
+                    for command, raw_output in zip(commands, raw_outputs)
+                }
+        else:
+            outputs = {}
+            for command in commands:
+                with self.timed(f'command:{command}'):
+                    raw_output = self.timed_send(
+                        command, lambda **read: self.session.send_command(command, **read), delay_factor,
+                        resend=True
+                    )
+                with self.timed('parse'):
+                    outputs[command] = self.parse(self.session.device_type, command, raw_output)
+            return outputs
+
+    def pipeline_commands(self, commands, delay_factor=1, max_loops=None):
+        """
+        :param commands: List of commands to run
+        :param delay_factor: Scales time to wait for device prompt after each command
+        :param max_loops: Read loops to wait for all prompts as in netmiko send_command, None for netmiko's default
+        :return: List of raw command outputs
+        """
+        prompt = self.session.find_prompt()
+        self.session.write_channel(''.join(f'{command}{self.session.RETURN}' for command in commands))
+        output = ''
+        if max_loops is None:
+            deadline = monotonic() + NETMIKO_READ_TIMEOUT * delay_factor
+        else:
+            deadline = monotonic() + max_loops * NETMIKO_LOOP_DELAY * delay_factor
+        while output.count(prompt) < len(commands):
+            if monotonic() > deadline:
+                raise OSError(f'Prompt {prompt} not detected after pipelined commands')
+            output += self.session.read_channel()
+            sleep(0.05)
+
+        # Each section starts with the command echo followed by its output
+        sections = output.split(prompt)[:len(commands)]
+        return [section.split('\n', 1)[1].strip('\r\n') if '\n' in section else '' for section in sections]
 
-    def send_config_set(self, config_set):
+    def running_config(self, delay_factor=None):
         """
+        :param delay_factor: delay_factor override, otherwise read timeout learned by LatencyTracker or delay_factor 60
+        :return: Raw output of 'show running-config'
+        """
+        command = 'show running-config'
+        with self.timed(f'command:{command}'):
+            return self.timed_send(command, lambda **read: self.session.send_command(command, **read), delay_factor)
+
+    def send_config_set(self, config_set, delay_factor=None, incremental=False, dry_run=False):
+        """
+        Incremental and dry run pushes fetch the running config once and compute the missing or changed lines
+        locally (see config_diff), a push that changes nothing does not enter config mode
+
         :param config_set: List of commands
-        :return: Output of commands
+        :param delay_factor: delay_factor override, otherwise read timeout learned by LatencyTracker or delay_factor 60
+        :param incremental: Bool to only send lines missing from running config
+        :param dry_run: Bool to return lines an incremental push would send without sending them
+        :return: Output of commands, list of config lines if dry_run
         """
         if self.session is None:
             pass
-        elif not self.privileged:
+        elif not self.has_privilege():
             raise NoConfigPriv
         else:
-            return self.session.send_config_set(config_set, delay_factor=60)
+            if incremental or dry_run:
+                running_config = self.running_config(delay_factor)
+                with self.timed('config_diff'):
+                    config_set = config_diff(running_config, config_set)
+                if dry_run:
+                    return config_set
+                elif not config_set:
+                    return ''
+            with self.timed('command:config_set'):
+                return self.timed_send(
+                    'config_set', lambda **read: self.session.send_config_set(config_set, **read), delay_factor
+                )
 
-    def send_config_file(self, config_file):
+    def send_config_file(self, config_file, delay_factor=None, incremental=False, dry_run=False):
         """
         :param config_file: Location of config .txt file
-        :return: Output of commands
+        :param delay_factor: delay_factor override, otherwise read timeout learned by LatencyTracker or delay_factor 60
+        :param incremental: Bool to only send lines missing from running config
+        :param dry_run: Bool to return lines an incremental push would send without sending them
+        :return: Output of commands, list of config lines if dry_run
         """
         with open(config_file) as file:
             config_set = file.readlines()
-            if self.session is None:
-                pass
-            elif not self.privileged:
-                raise NoConfigPriv
-            else:
-                return self.session.send_config_set(config_set, delay_factor=60)
+        return self.send_config_set(config_set, delay_factor, incremental, dry_run)
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def is_alive(self):
+        """
+        :return: Bool if device session is still open
+        """
+        if self.session is None:
+            return False
+        try:
+            return self.session.is_alive()
+        except Exception:
+            return False
+
+    def disconnect(self):
+        """Closes device session"""
         if self.session is not None:
-            self.session.disconnect()
+            with self.timed('disconnect'):
+                self.session.disconnect()
+            self.session = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+
+def white_space(max_length, string):
+    """
+    Calculates whitespace for uniform print spacing
+
+    :param max_length: Max length of possible string
+    :param string: String to parse
+    :return: String of whitespace
+    """
+    current_length = len(string)
+    space = ''
+    if current_length < max_length:
+        delta = max_length - current_length
+        for num in range(delta):
+            space += ' '
+    return space
+
+
+def first(values):
+    """
+    :param values: List parsed by TextFSM or None
+    :return: First value or '' if values is empty
+    """
+    if isinstance(values, list) and len(values) > 0:
+        return values[0]
+    return ''
+
+
+def successful_device(session):
+    """
+    Inventory errors are logged and leave inventory fields empty, they never fail the device after its function ran
+
+    :param session: Connection object
+    :return: Dictionary of successfully connected device
+    """
+    try:
+        inventory = session.inventory(fetch=session.inventory_mode != 'lazy')
+    except Exception as e:
+        exception(e)
+        inventory = {
+            'software_version': '',
+            'rommon_version': '',
+            'model': '',
+            'serial': ''
+        }
+    device = {
+        'ip_address': session.ip_address,
+        'connection_type': session.con_type,
+        'hostname': session.hostname,
+        'model': inventory['model'],
+        'rommon': inventory['rommon_version'],
+        'software_version': inventory['software_version'],
+        'serial': inventory['serial'],
+        'privileged': session.privileged,
+        'setup_time': session.setup_time,
+        'privilege_check_time': session.privilege_check_time,
+        'timings': session.timings
+    }
+    if session.inventory_mode == 'full':
+        try:
+            device['stack_members'] = session.stack_members()
+            device['inventory'] = session.show_inventory()
+        except Exception as e:
+            exception(e)
+            device.setdefault('stack_members', [])
+            device['inventory'] = []
+    return device
+
+
+def failed_device(session):
+    """
+    :param session: Connection object
+    :return: Dictionary of device that failed connectivity checks
+    """
+    return {
+        'ip_address': session.ip_address,
+        'connection_type': session.con_type,
+        'device_type': session.devicetype,
+        'connectivity': session.connectivity,
+        'authentication': session.authentication,
+        'authorization': session.authorization,
+        'privileged': session.privileged,
+        'exception': session.exception,
+        'timings': session.timings
+    }
+
+
+def unconnected_device(ip_address, exception_name):
+    """
+    :param ip_address: Management IP address of device
+    :param exception_name: Name of exception that prevented a session
+    :return: Dictionary of device that failed without a session
+    """
+    return {
+        'ip_address': ip_address,
+        'connection_type': None,
+        'device_type': 'autodetect',
+        'connectivity': False,
+        'authentication': False,
+        'authorization': False,
+        'privileged': False,
+        'exception': exception_name,
+        'timings': {}
+    }
 
 
 def multithread(function=None, iterable=None, threads=100):
     """
-    Multithreading handler
+    Multithreading handler, items are dispatched one at a time in iterable order as threads free up
 
     :param function: Function to run asyncronously
     :param iterable: Iterable for multiple threads
     :param threads: Number of threads to run
     """
+    from multiprocessing.dummy import Pool
     iter_len = len(iterable)
     if iter_len < threads:
         threads = iter_len
-    Pool(threads).map(function, iterable)
+    with Pool(threads) as thread_pool:
+        for _ in thread_pool.imap_unordered(function, iterable, chunksize=1):
+            pass
+
+
+class SessionHandler:
+    """
+    Per device session handler used by AsyncSessions worker threads
+
+    :param username: Device management username
+    :param password: Device management password
+    :param function: Function to run on each device
+    :param enable_pw: Devices' Enable Password
+    :param verbose: Bool to print progress to screen
+    :param fingerprint_cache: FingerprintCache used to skip autodetect and privilege probes
+    :param privilege_check: Privilege detection strategy (see PRIVILEGE_CHECKS)
+    :param latency_tracker: LatencyTracker used to select adaptive read timeouts
+    :param pool: SessionPool to borrow connections from instead of opening a new Connection per device
+    :param parser: ParserPool used to parse TextFSM output in other processes
+    :param retry_policy: RetryPolicy bounding ForceSessionRetry and session errors
+    :param scheduler: Scheduler limiting concurrency and rate of sessions
+    :param inventory: Inventory collection mode (see INVENTORY_MODES)
+    :param ssh_port: SSH TCP port of devices
+    :param telnet_port: TELNET TCP port of devices
+    """
+    def __init__(self, username, password, function, enable_pw='', verbose=False, fingerprint_cache=None,
+                 privilege_check='show_run', latency_tracker=None, pool=None, parser=None, retry_policy=None,
+                 scheduler=None, inventory='standard', ssh_port=22, telnet_port=23):
+        self.function = function
+        self.verbose = verbose
+        self.pool = pool
+        self.scheduler = scheduler
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.connection_args = {
+            'username': username,
+            'password': password,
+            'privilege_check': privilege_check,
+            'inventory': inventory,
+            'ssh_port': ssh_port,
+            'telnet_port': telnet_port
+        }
+        """Connection arguments shared by all devices"""
+        if enable_pw != '':
+            self.connection_args['enable_pw'] = enable_pw
+        if fingerprint_cache is not None:
+            self.connection_args['fingerprint_cache'] = fingerprint_cache
+        if latency_tracker is not None:
+            self.connection_args['latency_tracker'] = latency_tracker
+        if parser is not None:
+            self.connection_args['parser'] = parser
+        self.transports = {}
+        """Dictionary of transport to try first keyed by management IP address, set by reachability pre-scan"""
+
+        # Handler to lock screen to prevent overlapping verbose messages due to multithreading
+        self.screen_lock = Semaphore(value=1)
+
+    def sync_print(self, msg):
+        """Screen print handler to prevent multithread print overlapping
+
+        :param msg: String to print
+        """
+        self.screen_lock.acquire()
+        print(msg)
+        self.screen_lock.release()
+
+    def connect(self, args):
+        """
+        :param args: Connection arguments
+        :return: Context manager of Connection, borrowed from pool if provided
+        """
+        if self.pool is not None:
+            return self.pool.borrow(args['ip_address'], args)
+        return Connection(**args)
+
+    def __call__(self, ip_address):
+        """
+        Runs session within a scheduler slot if scheduler is provided
+
+        :param ip_address: Management IP address of device
+        :return: Dictionary of device, function output and bool if device was successful
+        """
+        if self.scheduler is None:
+            return self.session(ip_address)
+        self.scheduler.acquire(ip_address)
+        result = None
+        try:
+            result = self.session(ip_address)
+            return result
+        finally:
+            self.scheduler.release(ip_address, result)
+
+    def session(self, ip_address):
+        """
+        Base Connection handler
+
+        :param ip_address: Management IP address of device
+        :return: Dictionary of device, function output and bool if device was successful
+        """
+        args = dict(self.connection_args, ip_address=ip_address)
+        if ip_address in self.transports:
+            args['transport'] = self.transports[ip_address]
+        ip_space = white_space(15, ip_address)
+        attempt = 0
+        if self.verbose:
+            self.sync_print(f'Trying   | {ip_address}{ip_space} |')
+        while True:
+            attempt += 1
+            try:
+                with self.connect(args) as session:
+                    if not session.authorization:
+                        if self.verbose:
+                            self.sync_print(f'Failure  | {ip_address}{ip_space} |')
+                        return {
+                            'device': failed_device(session),
+                            'output': None,
+                            'successful': False
+                        }
+
+                    # Reconnects reuse learned device type and connection type instead of probing again
+                    args['fingerprint'] = session.fingerprint()
+                    while True:
+                        try:
+                            with session.timed('function'):
+                                output = self.function(session)
+                            if self.verbose:
+                                self.sync_print(f'Success  | {ip_address}{ip_space} | {session.hostname}')
+                            return {
+                                'device': successful_device(session),
+                                'output': output,
+                                'successful': True
+                            }
+
+                        # Used to manually force session retry within input function
+                        # if command output is not desired
+                        except ForceSessionRetry:
+                            if self.retry_policy.exhausted(attempt):
+                                session.exception = 'ForceSessionRetry'
+                                if self.verbose:
+                                    self.sync_print(f'Failure  | {ip_address}{ip_space} | {session.hostname}')
+                                return {
+                                    'device': failed_device(session),
+                                    'output': None,
+                                    'successful': False
+                                }
+                            if self.verbose:
+                                self.sync_print(f'Retrying | {ip_address}{ip_space} | {session.hostname}')
+                            sleep(self.retry_policy.delay(attempt + 1))
+
+                            # Retries on the same session while it is healthy
+                            if not session.is_alive():
+                                break
+                            attempt += 1
+                        except NoConfigPriv:
+                            session.exception = 'NoConfigPriv'
+                            if self.verbose:
+                                self.sync_print(f'Failure  | {ip_address}{ip_space} | {session.hostname}')
+                            return {
+                                'device': failed_device(session),
+                                'output': None,
+                                'successful': False
+                            }
+            except Exception as e:
+                exception(e)
+                if self.retry_policy.exhausted(attempt):
+                    if self.verbose:
+                        self.sync_print(f'Failure  | {ip_address}{ip_space} |')
+                    return {
+                        'device': unconnected_device(ip_address, type(e).__name__),
+                        'output': None,
+                        'successful': False
+                    }
+                sleep(self.retry_policy.delay(attempt + 1))
 
 
 class AsyncSessions:
@@ -270,8 +954,14 @@ class AsyncSessions:
                 'model': session.model,\n
                 'rommon': session.rommon_version,\n
                 'software_version': session.software_version,\n
-                'serial': session.serial\n
+                'serial': session.serial,\n
+                'privileged': session.privileged,\n
+                'setup_time': session.setup_time,\n
+                'privilege_check_time': session.privilege_check_time,\n
+                'timings': session.timings\n
             }
+        'full' inventory mode adds 'stack_members' and 'inventory' ('show inventory')\n
+        An output_store adds 'changed', False if output matches the previous run
     failed_devices : List of failed that failed connectivity checks
         Example device:
             {
@@ -281,7 +971,9 @@ class AsyncSessions:
                 'connectivity': session.connectivity,\n
                 'authentication': session.authentication,\n
                 'authorization': session.authorization,\n
-                'exception': session.exception\n
+                'privileged': session.privileged,\n
+                'exception': session.exception,\n
+                'timings': session.timings\n
             }
     outputs : List of dictionaries containing device info and function output
         Example:
@@ -296,114 +988,190 @@ class AsyncSessions:
     :param function: Function to run on each device
     :param enable_pw: Devices' Enable Password
     :param verbose: Bool to print progress to screen
+    :param threads: Max number of concurrent device sessions
+    :param fingerprint_cache: FingerprintCache used to skip autodetect and privilege probes, saved after run
+    :param privilege_check: Privilege detection strategy (see PRIVILEGE_CHECKS)
+    :param latency_tracker: LatencyTracker used to select adaptive read timeouts, saved after run
+    :param pool: SessionPool to borrow connections from, connections are left open for later runs
+    :param parser: ParserPool used to parse TextFSM output in other processes
+    :param hooks: List of MetricsHook receiving per device timings and run report
+    :param prescan: Bool to TCP probe SSH and TELNET ports of all devices before opening sessions
+    :param prescan_timeout: Seconds to wait for each pre-scan TCP connection
+    :param retry_policy: RetryPolicy bounding ForceSessionRetry and session errors, defaults to 3 attempts
+    :param sink: ResultSink full device results are written to, devices are kept in memory as DeviceRecords and
+        outputs is the sink
+    :param checkpoint: Checkpoint journaling each finished device result
+    :param resume: Bool to only run devices not already finished in checkpoint, journaled results are included in
+        outputs
+    :param scheduler: Scheduler limiting global and per group concurrency and rate of sessions
+    :param inventory: Inventory collection mode (see INVENTORY_MODES)
+    :param ssh_port: SSH TCP port of devices
+    :param telnet_port: TELNET TCP port of devices
+    :param output_store: OutputStore marking successful devices changed or unchanged since its last run, saved after
+        run
     """
-    def __init__(self, username, password, mgmt_ips, function, enable_pw='', verbose=False):
+    def __init__(self, username, password, mgmt_ips, function, enable_pw='', verbose=False, threads=100,
+                 fingerprint_cache=None, privilege_check='show_run', latency_tracker=None, pool=None, parser=None,
+                 hooks=(), prescan=False, prescan_timeout=3, retry_policy=None, sink=None, checkpoint=None,
+                 resume=False, scheduler=None, inventory='standard', ssh_port=22, telnet_port=23, output_store=None):
         self.successful_devices = []
         """List of devices successfully connected"""
         self.failed_devices = []
         """List of failed that failed connectivity checks"""
-        self.outputs = []
+        self.outputs = [] if sink is None else sink
         """List of dictionaries containing device info and function output"""
+        self.report = RunReport(hooks, keep_devices=sink is None)
+        """RunReport of per device phase timings, only aggregates are kept with a sink"""
+        self.sink = sink
+        self.checkpoint = checkpoint
 
-        # Handler to lock screen to prevent overlapping verbose messages due to multithreading
-        screen_lock = Semaphore(value=1)
+        if checkpoint is not None:
+            mgmt_ips = self.resume(mgmt_ips, resume)
+        try:
+            if len(self.successful_devices) + len(self.failed_devices) > 0 and len(mgmt_ips) == 0:
+                self.report.complete()
+            else:
+                for result in self.stream(
+                    username, password, mgmt_ips, function, enable_pw, verbose, threads,
+                    fingerprint_cache=fingerprint_cache, privilege_check=privilege_check,
+                    latency_tracker=latency_tracker, pool=pool, parser=parser, report=self.report, prescan=prescan,
+                    prescan_timeout=prescan_timeout, retry_policy=retry_policy, scheduler=scheduler,
+                    inventory=inventory, ssh_port=ssh_port, telnet_port=telnet_port, output_store=output_store
+                ):
+                    self.collect(result)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
 
-        def white_space(max_length, string):
-            """
-            Calculates whitespace for uniform print spacing
+    def resume(self, mgmt_ips, resume):
+        """
+        Opens checkpoint and collects results of devices already finished in it
 
-            :param max_length: Max length of possible string
-            :param string: String to parse
-            :return: String of whitespace
-            """
-            current_length = len(string)
-            space = ''
-            if current_length < max_length:
-                delta = max_length - current_length
-                for num in range(delta):
-                    space += ' '
-            return space
-
-        def sync_print(msg):
-            """Screen print handler to prevent multithread print overlapping
-
-            :param msg: String to print
-            """
-            screen_lock.acquire()
-            print(msg)
-            screen_lock.release()
-
-        def connection(ip_address):
-            """Base Connection handler"""
-            args = {
-                'username': username,
-                'password': password,
-                'ip_address': ip_address
+        :param mgmt_ips: Management IP addresses for devices
+        :param resume: Bool to keep results of checkpoint, otherwise it is truncated
+        :return: List of management IP addresses not finished in checkpoint
+        """
+        finished = self.checkpoint.open(resume)
+        for ip_address in mgmt_ips:
+            if ip_address in finished:
+                result = finished[ip_address]
+                self.report.add(ip_address, result['device']['timings'], result['successful'])
+                self.collect(result, journal=False)
+        return [ip_address for ip_address in mgmt_ips if ip_address not in finished]
+
+    def collect(self, result, journal=True):
+        """
+        Adds device result to outputs, successful_devices or failed_devices
+
+        :param result: Device result
+        :param journal: Bool to write result to checkpoint if provided
+        """
+        if journal and self.checkpoint is not None:
+            self.checkpoint.write(result)
+        if self.sink is not None:
+            record = self.sink.write(result)
+            if record.successful:
+                self.successful_devices.append(record)
+            else:
+                self.failed_devices.append(record)
+        elif result['successful']:
+            self.outputs.append(
+                {
+                    'device': result['device'],
+                    'output': result['output']
+                }
+            )
+            self.successful_devices.append(result['device'])
+        else:
+            self.failed_devices.append(result['device'])
+
+    @staticmethod
+    def stream(username, password, mgmt_ips, function, enable_pw='', verbose=False, threads=100,
+               fingerprint_cache=None, privilege_check='show_run', latency_tracker=None, pool=None, parser=None,
+               report=None, prescan=False, prescan_timeout=3, retry_policy=None, scheduler=None, inventory='standard',
+               ssh_port=22, telnet_port=23, output_store=None):
+        """
+        Generator yielding each device result as soon as its session completes instead of waiting for all devices\n
+        Example result:
+            {
+                'device': successful or failed device(see AsyncSessions),\n
+                'output': function return or None if device failed,\n
+                'successful': bool\n
             }
-            no_config_priv = False
-            ip_space = white_space(15, ip_address)
-            if enable_pw != '':
-                args['enable_pw'] = enable_pw
-            if verbose:
-                sync_print(f'Trying   | {ip_address}{ip_space} |')
-            while True:
-                try:
-                    with Connection(**args) as session:
-                        if session.authorization and not no_config_priv:
-                            device = {
-                                'ip_address': ip_address,
-                                'connection_type': session.con_type,
-                                'hostname': session.hostname,
-                                'model': session.model,
-                                'rommon': session.rommon_version,
-                                'software_version': session.software_version,
-                                'serial': session.serial,
-                                'privileged': session.privileged
-                            }
-                            try:
-                                self.outputs.append(
-                                    {
-                                        'device': device,
-                                        'output': function(session)
-                                    }
-                                )
-                                self.successful_devices.append(device)
-                                if verbose:
-                                    sync_print(f'Success  | {ip_address}{ip_space} | {session.hostname}')
-
-                            # Used to manually force session retry within input function
-                            # if command output is not desired
-                            except ForceSessionRetry:
-                                if verbose:
-                                    sync_print(f'Retrying | {ip_address}{ip_space} | {session.hostname}')
-                                continue
-                            except NoConfigPriv:
-                                no_config_priv = True
-                                continue
-                        else:
-                            if no_config_priv:
-                                session.exception = 'NoConfigPriv'
-                            device = {
-                                'ip_address': ip_address,
-                                'connection_type': session.con_type,
-                                'device_type': session.devicetype,
-                                'connectivity': session.connectivity,
-                                'authentication': session.authentication,
-                                'authorization': session.authorization,
-                                'privileged': session.privileged,
-                                'exception': session.exception
-                            }
-                            self.failed_devices.append(device)
-                            if verbose:
-                                sync_print(f'Failure  | {ip_address}{ip_space} |')
-                        break
-                except Exception as e:
-                    exception(e)
 
+        :param username: Device management username
+        :param password: Device management password
+        :param mgmt_ips: Management IP addresses for devices
+        :param function: Function to run on each device
+        :param enable_pw: Devices' Enable Password
+        :param verbose: Bool to print progress to screen
+        :param threads: Max number of concurrent device sessions
+        :param fingerprint_cache: FingerprintCache used to skip autodetect and privilege probes, saved after run
+        :param privilege_check: Privilege detection strategy (see PRIVILEGE_CHECKS)
+        :param latency_tracker: LatencyTracker used to select adaptive read timeouts, saved after run
+        :param pool: SessionPool to borrow connections from, connections are left open for later runs
+        :param parser: ParserPool used to parse TextFSM output in other processes
+        :param report: RunReport updated as devices complete, None to keep no per device state
+        :param prescan: Bool to TCP probe SSH and TELNET ports of all devices before opening sessions, unreachable
+            devices fail with exception 'Unreachable' without opening a session
+        :param prescan_timeout: Seconds to wait for each pre-scan TCP connection
+        :param retry_policy: RetryPolicy bounding ForceSessionRetry and session errors, defaults to 3 attempts
+        :param scheduler: Scheduler limiting global and per group concurrency and rate of sessions
+        :param inventory: Inventory collection mode (see INVENTORY_MODES)
+        :param ssh_port: SSH TCP port of devices
+        :param telnet_port: TELNET TCP port of devices
+        :param output_store: OutputStore adding 'changed' to successful devices, saved after run
+        :return: Iterator of device results in order of completion
+        """
         try:
             if len(mgmt_ips) == 0:
                 raise InputError('No Management IP Addresses found')
         except TypeError:
             raise InputError('No Management IP Addresses found')
 
-        multithread(connection, mgmt_ips)
+        handler = SessionHandler(
+            username, password, function, enable_pw, verbose, fingerprint_cache, privilege_check, latency_tracker, pool,
+            parser, retry_policy, scheduler, inventory, ssh_port, telnet_port
+        )
+        try:
+            if prescan:
+                handler.transports = reachability_scan(
+                    mgmt_ips, prescan_timeout, ssh_port=ssh_port, telnet_port=telnet_port
+                )
+                unreachable = {
+                    ip_address for ip_address, transport in handler.transports.items() if transport is None
+                }
+                for ip_address in mgmt_ips:
+                    if ip_address in unreachable:
+                        if verbose:
+                            handler.sync_print(f'Failure  | {ip_address}{white_space(15, ip_address)} |')
+                        result = {
+                            'device': unconnected_device(ip_address, 'Unreachable'),
+                            'output': None,
+                            'successful': False
+                        }
+                        if report is not None:
+                            report.add(ip_address, result['device']['timings'], False)
+                        yield result
+                mgmt_ips = [ip_address for ip_address in mgmt_ips if ip_address not in unreachable]
+            if scheduler is not None:
+                mgmt_ips = scheduler.order(mgmt_ips)
+            if len(mgmt_ips) > 0:
+                from multiprocessing.dummy import Pool
+                with Pool(min(threads, len(mgmt_ips))) as thread_pool:
+                    for result in thread_pool.imap_unordered(handler, mgmt_ips, chunksize=1):
+                        if output_store is not None and result['successful']:
+                            result['device']['changed'] = output_store.changed(
+                                result['device']['ip_address'], result['output']
+                            )
+                        if report is not None:
+                            report.add(
+                                result['device']['ip_address'], result['device']['timings'], result['successful']
+                            )
+                        yield result
+            if report is not None:
+                report.complete()
+        finally:
+            for store in (fingerprint_cache, latency_tracker, output_store):
+                if store is not None:
+                    store.save()
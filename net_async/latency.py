@@ -0,0 +1,120 @@
+import json
+import os
+from math import ceil
+from threading import Lock
+
+NETMIKO_READ_TIMEOUT = 100
+"""Approximate seconds netmiko reads command output for at delay_factor=1"""
+
+NETMIKO_LOOP_DELAY = 0.2
+"""Seconds netmiko send_command sleeps per read loop at delay_factor=1"""
+
+
+def max_loops(timeout):
+    """
+    :param timeout: Seconds to read command output
+    :return: netmiko max_loops reading for timeout seconds at delay_factor=1
+    """
+    return max(ceil(timeout / NETMIKO_LOOP_DELAY), 1)
+
+
+class LatencyTracker:
+    """
+    Learns per device, per command latency to select netmiko read timeouts\n
+    Commands without history are read for default_timeout seconds, commands with history for headroom times their
+    EWMA latency or their peak, whichever is longer, so hung reads on fast devices fail quickly while slow devices
+    still complete. Timed out reads are recorded as a peak of headroom times their timeout, so the next read
+    waits longer, and single show commands are resent once with that longer timeout.\n
+    Example latency:
+        {
+            'ewma': 1.2,\n
+            'peak': 3.4\n
+        }
+
+    :param path: Optional location of .json file to persist latencies across runs
+    :param headroom: Multiplier applied to learned latency and to timeouts of timed out reads
+    :param alpha: Smoothing factor of exponentially weighted moving average
+    :param default_timeout: Seconds to read commands without history
+    :param min_timeout: Lower bound of read timeouts
+    :param max_timeout: Upper bound of read timeouts
+    """
+    def __init__(self, path=None, headroom=3, alpha=0.3, default_timeout=NETMIKO_READ_TIMEOUT, min_timeout=2,
+                 max_timeout=600):
+        self.path = path
+        self.headroom = headroom
+        self.alpha = alpha
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.latencies = {}
+        """Dictionary of command latencies keyed by management IP address then command"""
+        self.lock = Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as file:
+                    self.latencies = json.load(file)
+            except (ValueError, OSError):
+                self.latencies = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def timeout(self, ip_address, command):
+        """
+        :param ip_address: Management IP address of device
+        :param command: Command or command key
+        :return: Seconds to read command output
+        """
+        with self.lock:
+            latency = self.latencies.get(ip_address, {}).get(command)
+        if latency is None:
+            return self.default_timeout
+        expected = max(latency['ewma'] * self.headroom, latency['peak'])
+        return min(max(expected, self.min_timeout), self.max_timeout)
+
+    def record(self, ip_address, command, seconds):
+        """
+        :param ip_address: Management IP address of device
+        :param command: Command or command key
+        :param seconds: Seconds command took to complete
+        """
+        with self.lock:
+            commands = self.latencies.setdefault(ip_address, {})
+            latency = commands.get(command)
+            if latency is None:
+                commands[command] = {'ewma': seconds, 'peak': seconds}
+            else:
+                latency['ewma'] = self.alpha * seconds + (1 - self.alpha) * latency['ewma']
+                latency['peak'] = max(latency['peak'], seconds)
+
+    def record_timeout(self, ip_address, command, seconds):
+        """
+        Records a timed out read as a peak of headroom times its timeout, EWMA is left unchanged
+
+        :param ip_address: Management IP address of device
+        :param command: Command or command key
+        :param seconds: Read timeout that expired
+        :return: Seconds to read command output next time
+        """
+        peak = min(seconds * self.headroom, self.max_timeout)
+        with self.lock:
+            commands = self.latencies.setdefault(ip_address, {})
+            latency = commands.get(command)
+            if latency is None:
+                commands[command] = {'ewma': seconds, 'peak': peak}
+            else:
+                latency['peak'] = max(latency['peak'], peak)
+        return self.timeout(ip_address, command)
+
+    def save(self):
+        """Writes latencies to file if path was provided"""
+        if self.path is None:
+            return
+        with self.lock:
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(self.latencies, file)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,217 @@
+import heapq
+from random import randrange
+from threading import Lock
+from time import perf_counter
+from net_async.exceptions import InputError
+
+DEVICE_PHASES = ('setup', 'function', 'disconnect')
+"""Top level phases that together make up a device's total time, all other phases are nested within them"""
+
+
+def percentile(values, percent):
+    """
+    :param values: Sorted list of numbers
+    :param percent: Percentile between 0 and 100
+    :return: Nearest rank percentile of values
+    """
+    if not values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class MetricsHook:
+    """
+    Base class of hooks receiving timings from AsyncSessions, override either method to ship timings to a metrics
+    pipeline. device_completed is called as each device result is collected.
+    """
+    def device_completed(self, ip_address, timings, successful):
+        """
+        :param ip_address: Management IP address of device
+        :param timings: Dictionary of seconds spent per phase
+        :param successful: Bool if device was successful
+        """
+        pass
+
+    def run_completed(self, report):
+        """
+        :param report: RunReport of completed run
+        """
+        pass
+
+
+class RunReport:
+    """
+    Aggregated per device phase timings of a run\n
+    Phases:
+        autodetect: SSH device type autodetection\n
+        connect: TCP connect, SSH/TELNET handshake, authentication and session preparation\n
+        enable: Entering enable mode\n
+        command:<command>: Each command sent, including device_check probes\n
+        parse: TextFSM parsing\n
+        privilege_check: Privilege probe\n
+        setup: Total Connection setup\n
+        function: Function run on device\n
+        disconnect: Closing session\n
+    Without keep_devices only aggregates are kept so memory stays flat on large fleets: per phase count, total and
+    max, a fixed size random sample of each phase for percentiles and the slowest devices. device_totals() and
+    makespan simulations then raise InputError.
+
+    :param hooks: List of MetricsHook
+    :param keep_devices: Bool to keep phase timings of every device
+    :param slowest: Number of slowest devices kept
+    :param sample_size: Number of timings per phase sampled for percentiles without keep_devices
+    """
+    def __init__(self, hooks=(), keep_devices=True, slowest=10, sample_size=1000):
+        self.hooks = list(hooks)
+        self.keep_devices = keep_devices
+        self.slowest = slowest
+        self.sample_size = sample_size
+        self.devices = {}
+        """Dictionary of phase timings keyed by management IP address, empty without keep_devices"""
+        self.failed = set()
+        """Set of management IP addresses of failed devices, empty without keep_devices"""
+        self.device_count = 0
+        self.failed_count = 0
+        self.phases = {}
+        """Dictionary of count, total, max and sample of timings keyed by phase, without keep_devices"""
+        self.slowest_devices = []
+        """Heap of (seconds, management IP address) of slowest devices"""
+        self.start = perf_counter()
+        self.wall_time = 0.0
+        """Seconds from start to end of run"""
+        self.lock = Lock()
+
+    def add(self, ip_address, timings, successful):
+        """
+        :param ip_address: Management IP address of device
+        :param timings: Dictionary of seconds spent per phase
+        :param successful: Bool if device was successful
+        """
+        total = sum(timings.get(phase, 0.0) for phase in DEVICE_PHASES)
+        with self.lock:
+            self.device_count += 1
+            if not successful:
+                self.failed_count += 1
+            if len(self.slowest_devices) < self.slowest:
+                heapq.heappush(self.slowest_devices, (total, ip_address))
+            elif self.slowest > 0 and total > self.slowest_devices[0][0]:
+                heapq.heapreplace(self.slowest_devices, (total, ip_address))
+            if self.keep_devices:
+                self.devices[ip_address] = timings
+                if not successful:
+                    self.failed.add(ip_address)
+            else:
+                for phase, seconds in timings.items():
+                    stat = self.phases.setdefault(phase, {'count': 0, 'total': 0.0, 'max': 0.0, 'sample': []})
+                    stat['count'] += 1
+                    stat['total'] += seconds
+                    stat['max'] = max(stat['max'], seconds)
+                    # Reservoir sampling keeps every timing equally likely to be in the sample
+                    if len(stat['sample']) < self.sample_size:
+                        stat['sample'].append(seconds)
+                    else:
+                        index = randrange(stat['count'])
+                        if index < self.sample_size:
+                            stat['sample'][index] = seconds
+        for hook in self.hooks:
+            hook.device_completed(ip_address, timings, successful)
+
+    def complete(self):
+        """Records wall time and notifies hooks that run completed"""
+        self.wall_time = perf_counter() - self.start
+        for hook in self.hooks:
+            hook.run_completed(self)
+
+    def phase_stats(self, percentiles=(50, 90, 99)):
+        """
+        :param percentiles: Percentiles to calculate
+        :return: Dictionary of count, total, max and percentiles keyed by phase
+        """
+        phases = {}
+        with self.lock:
+            if self.keep_devices:
+                for timings in self.devices.values():
+                    for phase, seconds in timings.items():
+                        phases.setdefault(phase, []).append(seconds)
+                phases = {
+                    phase: {'count': len(values), 'total': sum(values), 'max': max(values), 'sample': values}
+                    for phase, values in phases.items()
+                }
+            else:
+                phases = {phase: dict(stat, sample=list(stat['sample'])) for phase, stat in self.phases.items()}
+        stats = {}
+        for phase, stat in phases.items():
+            values = sorted(stat.pop('sample'))
+            stats[phase] = stat
+            for percent in percentiles:
+                stats[phase][f'p{percent}'] = percentile(values, percent)
+        return stats
+
+    def device_totals(self):
+        """
+        :return: Dictionary of seconds per device, sum of non overlapping setup, function and disconnect phases
+        """
+        if not self.keep_devices:
+            raise InputError('Device totals require a RunReport with keep_devices')
+        with self.lock:
+            return {
+                ip_address: sum(timings.get(phase, 0.0) for phase in DEVICE_PHASES)
+                for ip_address, timings in self.devices.items()
+            }
+
+    def makespan(self, order, workers):
+        """
+        Simulates dispatching this run's devices one at a time to the next free worker, used to compare orders
+
+        :param order: Management IP addresses in dispatch order, devices not in report are skipped
+        :param workers: Number of concurrent sessions
+        :return: Seconds from first dispatch until last device completes
+        """
+        totals = self.device_totals()
+        finish_times = [0.0] * max(workers, 1)
+        for ip_address in order:
+            if ip_address in totals:
+                heapq.heapreplace(finish_times, finish_times[0] + totals[ip_address])
+        return max(finish_times)
+
+    def makespan_comparison(self, file_order, scheduled_order, workers):
+        """
+        :param file_order: Management IP addresses in file order
+        :param scheduled_order: Management IP addresses in scheduled order (see Scheduler.order)
+        :param workers: Number of concurrent sessions
+        :return: Dictionary of simulated makespans of both orders, fraction saved by scheduled order and lower bound
+            of any order
+        """
+        totals = list(self.device_totals().values())
+        file_makespan = self.makespan(file_order, workers)
+        scheduled_makespan = self.makespan(scheduled_order, workers)
+        return {
+            'file_order': file_makespan,
+            'scheduled_order': scheduled_makespan,
+            'improvement': 1 - scheduled_makespan / file_makespan if file_makespan else 0.0,
+            'lower_bound': max(sum(totals) / max(workers, 1), max(totals, default=0.0))
+        }
+
+    def summary(self, slowest=10, percentiles=(50, 90, 99)):
+        """
+        :param slowest: Number of slowest devices and phases to include
+        :param percentiles: Percentiles to calculate
+        :return: Dictionary summary of run
+        """
+        stats = self.phase_stats(percentiles)
+        with self.lock:
+            slowest_devices = [(ip_address, seconds) for seconds, ip_address in self.slowest_devices]
+        if self.keep_devices:
+            slowest_devices = self.device_totals().items()
+        return {
+            'devices': len(self.devices) if self.keep_devices else self.device_count,
+            'failed_devices': len(self.failed) if self.keep_devices else self.failed_count,
+            'wall_time': self.wall_time,
+            'phases': stats,
+            'slowest_devices': sorted(slowest_devices, key=lambda item: item[1], reverse=True)[:slowest],
+            'slowest_phases': sorted(
+                ((phase, stat['total']) for phase, stat in stats.items() if phase not in DEVICE_PHASES),
+                key=lambda item: item[1], reverse=True
+            )[:slowest]
+        }
@@ -0,0 +1,132 @@
+import os
+import sys
+from threading import Lock, local
+from net_async.exceptions import TemplatesNotFoundWithinPackage
+
+_index_lock = Lock()
+_index = {}
+_compiled = local()
+_template_path = None
+
+
+def template_path():
+    """
+    Locates TextFSM templates once and exports them as NET_TEXTFSM for netmiko, an existing NET_TEXTFSM is kept\n
+    Frozen builds use the single file bundle, otherwise the templates installed with the package are used, falling
+    back to ./net_async/templates and ./templates
+
+    :return: TextFSM templates directory
+    """
+    global _template_path
+    if _template_path is None:
+        if 'NET_TEXTFSM' in os.environ:
+            path = os.environ['NET_TEXTFSM']
+        elif getattr(sys, 'frozen', False):
+            path = sys._MEIPASS
+        else:
+            for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'),
+                         './net_async/templates', './templates'):
+                if os.path.exists(path):
+                    break
+            else:
+                raise TemplatesNotFoundWithinPackage
+        os.environ['NET_TEXTFSM'] = _template_path = path
+    return _template_path
+
+
+def template_index():
+    """
+    :return: CliTable of TextFSM template index, loaded once per process
+    """
+    from textfsm import clitable
+    template_dir = template_path()
+    with _index_lock:
+        if template_dir not in _index:
+            _index[template_dir] = clitable.CliTable('index', template_dir)
+        return _index[template_dir]
+
+
+def compiled_template(template_dir, template):
+    """
+    Compiled templates are stateful, so they are cached per thread
+
+    :param template_dir: TextFSM templates directory
+    :param template: Template file name
+    :return: Compiled TextFSM template
+    """
+    templates = getattr(_compiled, 'templates', None)
+    if templates is None:
+        templates = _compiled.templates = {}
+    fsm = templates.get((template_dir, template))
+    if fsm is None:
+        from textfsm import TextFSM
+        with open(os.path.join(template_dir, template)) as file:
+            fsm = templates[(template_dir, template)] = TextFSM(file)
+    else:
+        fsm.Reset()
+    return fsm
+
+
+def parse_output(platform, command, raw_output):
+    """
+    Parses raw command output with the bundled TextFSM templates\n
+    Template index and compiled templates are cached, rows spanning multiple templates are parsed by netmiko
+
+    :param platform: Netmiko device type
+    :param command: Command that produced output
+    :param raw_output: Raw command output
+    :return: TextFSM structured data, or raw output if no template matches or parsing fails
+    """
+    from textfsm import clitable
+    from textfsm.parser import TextFSMError
+    try:
+        table = template_index()
+        row = table.index.GetRowMatch({'Platform': platform, 'Command': command})
+        if not row:
+            return raw_output
+        template = table.index.index[row]['Template']
+        if ':' in template:
+            from netmiko.utilities import get_structured_data
+            return get_structured_data(raw_output, platform=platform, command=command)
+        fsm = compiled_template(template_path(), template)
+        structured_data = [
+            {header.lower(): value for header, value in zip(fsm.header, values)}
+            for values in fsm.ParseText(raw_output)
+        ]
+    except (TextFSMError, clitable.CliTableError, OSError):
+        return raw_output
+    if not structured_data:
+        return raw_output
+    return structured_data
+
+
+class ParserPool:
+    """
+    Process pool parsing TextFSM output away from I/O worker threads\n
+    Worker threads wait on parse results without holding the GIL, so other sessions keep reading their sockets
+    while large outputs are parsed on other cores.
+
+    :param processes: Number of parser processes, defaults to number of CPUs
+    """
+    def __init__(self, processes=None):
+        from concurrent.futures import ProcessPoolExecutor
+        self.executor = ProcessPoolExecutor(max_workers=processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def parse(self, platform, command, raw_output):
+        """
+        :param platform: Netmiko device type
+        :param command: Command that produced output
+        :param raw_output: Raw command output
+        :return: TextFSM structured data, or raw output if no template matches or parsing fails
+        """
+        return self.executor.submit(parse_output, platform, command, raw_output).result()
+
+    def close(self):
+        """Shuts down parser processes"""
+        self.executor.shutdown()
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from threading import Lock, Semaphore
+from time import monotonic
+from net_async.handlers import Connection
+from net_async.parsing import parse_output
+
+POOL_KEY_ARGS = ('device_type', 'ssh_port', 'telnet_port', 'privilege_check', 'inventory')
+"""Connection arguments an idle connection must have been opened with to be reused"""
+
+POOL_CREDENTIAL_ARGS = ('username', 'password', 'enable_pw')
+"""Connection arguments always taken from the pool"""
+
+
+class SessionPool:
+    """
+    Pool of authenticated Connections kept open between AsyncSessions runs\n
+    Idle connections are reused by later borrows of the same management IP address until idle_timeout expires,
+    so repeated jobs against the same devices skip the SSH handshake, authentication and device probes.\n
+    Per run Connection arguments passed to acquire() or borrow() override the pool's, except credentials. Idle
+    connections are only reused when opened with the same POOL_KEY_ARGS, per run latency_tracker and parser are
+    applied to reused connections.
+
+    :param username: Device management username
+    :param password: Device management password
+    :param enable_pw: Devices' Enable Password
+    :param idle_timeout: Seconds an unused connection is kept open
+    :param max_per_host: Max number of open connections per management IP address
+    :param connection_args: Additional Connection arguments (fingerprint_cache, privilege_check, latency_tracker)
+    """
+    def __init__(self, username, password, enable_pw='', idle_timeout=300, max_per_host=1, **connection_args):
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.connection_args = dict(connection_args, username=username, password=password)
+        """Connection arguments shared by all devices"""
+        if enable_pw != '':
+            self.connection_args['enable_pw'] = enable_pw
+        self.idle = {}
+        """Dictionary of idle (connection, last used) lists keyed by management IP address and POOL_KEY_ARGS"""
+        self.host_limits = {}
+        self.lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def host_limit(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        :return: Semaphore limiting open connections to device
+        """
+        with self.lock:
+            if ip_address not in self.host_limits:
+                self.host_limits[ip_address] = Semaphore(self.max_per_host)
+            return self.host_limits[ip_address]
+
+    def acquire(self, ip_address, args=None):
+        """
+        Blocks until a connection slot for device is available
+
+        :param ip_address: Management IP address of device
+        :param args: Per run Connection arguments (ssh_port, privilege_check, transport, fingerprint, etc.)
+        :return: Idle Connection if one opened with the same POOL_KEY_ARGS is still alive, otherwise new Connection
+        """
+        connection_args = dict(self.connection_args)
+        if args is not None:
+            connection_args.update(
+                (key, value) for key, value in args.items() if key not in POOL_CREDENTIAL_ARGS
+            )
+        connection_args['ip_address'] = ip_address
+        key = (ip_address,) + tuple(connection_args.get(arg) for arg in POOL_KEY_ARGS)
+        self.host_limit(ip_address).acquire()
+        try:
+            while True:
+                with self.lock:
+                    idle = self.idle.get(key)
+                    if not idle:
+                        break
+                    connection, last_used = idle.pop()
+                if monotonic() - last_used < self.idle_timeout and connection.is_alive():
+                    connection.timings = {}
+                    connection.exception = 'None'
+                    connection.setup_time = 0.0
+                    connection.privilege_check_time = 0.0
+                    connection.latency_tracker = connection_args.get('latency_tracker')
+                    parser = connection_args.get('parser')
+                    connection.parse = parse_output if parser is None else parser.parse
+                    return connection
+                connection.disconnect()
+            connection = Connection(**connection_args)
+            connection.pool_key = key
+            return connection
+        except BaseException:
+            self.host_limit(ip_address).release()
+            raise
+
+    def release(self, connection, reuse=True):
+        """
+        :param connection: Connection returned by acquire()
+        :param reuse: Bool to keep connection open for later borrows, otherwise it is disconnected
+        """
+        try:
+            if reuse and connection.authorization and connection.is_alive():
+                with self.lock:
+                    self.idle.setdefault(connection.pool_key, []).append((connection, monotonic()))
+            else:
+                connection.disconnect()
+        finally:
+            self.host_limit(connection.ip_address).release()
+
+    @contextmanager
+    def borrow(self, ip_address, args=None):
+        """
+        Context manager returning connection to pool on exit, or disconnecting it if an exception was raised
+
+        :param ip_address: Management IP address of device
+        :param args: Per run Connection arguments (see acquire)
+        :return: Connection
+        """
+        connection = self.acquire(ip_address, args)
+        try:
+            yield connection
+        except BaseException:
+            self.release(connection, reuse=False)
+            raise
+        else:
+            self.release(connection)
+
+    def prune(self):
+        """Disconnects idle connections past idle_timeout"""
+        now = monotonic()
+        expired = []
+        with self.lock:
+            for ip_address, idle in self.idle.items():
+                expired.extend(connection for connection, last_used in idle if now - last_used >= self.idle_timeout)
+                idle[:] = [(connection, last_used) for connection, last_used in idle
+                           if now - last_used < self.idle_timeout]
+        for connection in expired:
+            connection.disconnect()
+
+    def close(self):
+        """Disconnects all idle connections"""
+        with self.lock:
+            idle = [connection for connections in self.idle.values() for connection, last_used in connections]
+            self.idle = {}
+        for connection in idle:
+            connection.disconnect()
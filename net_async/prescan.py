@@ -0,0 +1,69 @@
+import asyncio
+import errno
+
+CLOSED_ERRNOS = frozenset(
+    getattr(errno, name) for name in (
+        'ECONNREFUSED', 'ECONNRESET', 'ETIMEDOUT', 'EHOSTUNREACH', 'ENETUNREACH', 'EHOSTDOWN', 'ENETDOWN'
+    ) if hasattr(errno, name)
+)
+"""Connection errors answered by the network or device, other errors (EMFILE, ENOBUFS) are failures of the probe"""
+
+
+async def port_open(ip_address, port, timeout):
+    """
+    :param ip_address: IP address of device
+    :param port: TCP port
+    :param timeout: Seconds to wait for TCP connection
+    :return: Bool if TCP connection was established, None if the probe itself failed
+    """
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip_address, port), timeout)
+    except asyncio.TimeoutError:
+        return False
+    except OSError as e:
+        return False if e.errno in CLOSED_ERRNOS else None
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def async_reachability_scan(mgmt_ips, timeout=3, concurrency=1000, ssh_port=22, telnet_port=23):
+    """
+    Non blocking TCP probe of SSH and TELNET ports of all devices
+
+    :param mgmt_ips: Management IP addresses for devices
+    :param timeout: Seconds to wait for each TCP connection
+    :param concurrency: Max number of concurrent probes
+    :param ssh_port: SSH TCP port
+    :param telnet_port: TELNET TCP port
+    :return: Dictionary of transport to try first keyed by management IP address, 'SSH', 'TELNET' or None if
+        neither port is open. Devices whose probe failed locally (e.g. out of file descriptors) are left out so
+        they are still connected without a transport hint
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan(ip_address):
+        async with semaphore:
+            ssh = await port_open(ip_address, ssh_port, timeout)
+            if ssh:
+                return ip_address, 'SSH'
+            telnet = await port_open(ip_address, telnet_port, timeout)
+            if telnet:
+                return ip_address, 'TELNET'
+            elif ssh is None or telnet is None:
+                return None
+            return ip_address, None
+
+    return dict(result for result in await asyncio.gather(*(scan(ip_address) for ip_address in mgmt_ips)) if result)
+
+
+def reachability_scan(mgmt_ips, timeout=3, concurrency=1000, ssh_port=22, telnet_port=23):
+    """
+    Non blocking TCP probe of SSH and TELNET ports of all devices, see async_reachability_scan
+
+    :return: Dictionary of transport to try first keyed by management IP address
+    """
+    return asyncio.run(async_reachability_scan(mgmt_ips, timeout, concurrency, ssh_port, telnet_port))
@@ -0,0 +1,244 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from threading import Lock
+
+
+class DeviceRecord:
+    """
+    Compact summary of a device result kept in memory while the full device dict and function output are written to
+    a ResultSink\n
+    Supports device['ip_address'] style access like the dictionaries of AsyncSessions.
+
+    :param ip_address: Management IP address of device
+    :param successful: Bool if device was successful
+    :param connection_type: 'SSH', 'TELNET' or None
+    :param hostname: Device hostname or None if device failed
+    :param exception: Exception name or None if device was successful
+    :param key: Key of full result in ResultSink
+    :param changed: Bool if output changed since the previous run, None without an OutputStore
+    """
+    __slots__ = ('ip_address', 'successful', 'connection_type', 'hostname', 'exception', 'key', 'changed')
+
+    def __init__(self, ip_address, successful, connection_type=None, hostname=None, exception=None, key=None,
+                 changed=None):
+        self.ip_address = ip_address
+        self.successful = successful
+        self.connection_type = connection_type
+        self.hostname = hostname
+        self.exception = exception
+        self.key = key
+        self.changed = changed
+
+    def __getitem__(self, item):
+        try:
+            return getattr(self, item)
+        except (AttributeError, TypeError):
+            raise KeyError(item)
+
+    def __repr__(self):
+        return f'DeviceRecord({self.ip_address!r}, successful={self.successful!r})'
+
+    def get(self, item, default=None):
+        try:
+            return self[item]
+        except KeyError:
+            return default
+
+    @classmethod
+    def from_result(cls, result, key=None):
+        """
+        :param result: Device result (see AsyncSessions.stream)
+        :param key: Key of full result in ResultSink
+        :return: DeviceRecord
+        """
+        device = result['device']
+        return cls(
+            device['ip_address'],
+            result['successful'],
+            device.get('connection_type'),
+            device.get('hostname'),
+            device.get('exception'),
+            key,
+            device.get('changed')
+        )
+
+
+class ResultSink(ABC):
+    """
+    Base class of append only stores device results are streamed to instead of being kept in memory\n
+    Iterating a sink lazily yields successful device outputs in the same format as AsyncSessions.outputs.
+    Subclasses must implement append, load and results to add a storage format, a sink missing one fails when it is
+    constructed.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        for result in self.results():
+            if result['successful']:
+                yield {
+                    'device': result['device'],
+                    'output': result['output']
+                }
+
+    def write(self, result):
+        """
+        :param result: Device result (see AsyncSessions.stream)
+        :return: DeviceRecord of result
+        """
+        return DeviceRecord.from_result(result, self.append(result))
+
+    def get(self, record):
+        """
+        :param record: DeviceRecord returned by write()
+        :return: Full device result
+        """
+        return self.load(record.key)
+
+    @abstractmethod
+    def append(self, result):
+        """
+        :param result: Device result
+        :return: Key to load result with
+        """
+
+    @abstractmethod
+    def load(self, key):
+        """
+        :param key: Key returned by append()
+        :return: Device result
+        """
+
+    @abstractmethod
+    def results(self):
+        """
+        :return: Iterator of all device results in the order written
+        """
+
+    def close(self):
+        """Flushes and closes sink"""
+        pass
+
+
+class JSONLSink(ResultSink):
+    """
+    Result sink writing one JSON line per device result\n
+    Outputs that are not JSON serializable are converted with str().
+
+    :param path: Path of JSONL file, truncated unless append is True
+    :param append: Bool to keep existing results in file
+    """
+    def __init__(self, path='results.jsonl', append=False):
+        self.path = path
+        self.file = open(path, 'a+b' if append else 'w+b')
+        self.file.seek(0, 2)
+        self.lock = Lock()
+
+    def append(self, result):
+        line = json.dumps(result, default=str).encode() + b'\n'
+        with self.lock:
+            self.file.seek(0, 2)
+            offset = self.file.tell()
+            self.file.write(line)
+        return offset
+
+    def load(self, key):
+        with self.lock:
+            self.file.flush()
+            with open(self.path, 'rb') as file:
+                file.seek(key)
+                return json.loads(file.readline())
+
+    def results(self):
+        with self.lock:
+            self.file.flush()
+        with open(self.path, 'rb') as file:
+            for line in file:
+                yield json.loads(line)
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class SQLiteSink(ResultSink):
+    """
+    Result sink writing device results to a SQLite table, queryable with select()\n
+    Columns: ip_address, successful, connection_type, hostname, exception, device (JSON) and output (JSON)
+
+    :param path: Path of SQLite database, ':memory:' keeps results in memory
+    :param table: Table name, existing rows are kept
+    :param commit_every: Number of results written between commits
+    """
+    def __init__(self, path='results.sqlite', table='results', commit_every=500):
+        self.path = path
+        self.table = table
+        self.commit_every = commit_every
+        self.pending = 0
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} (ip_address TEXT, successful INTEGER, connection_type TEXT, '
+            f'hostname TEXT, exception TEXT, device TEXT, output TEXT)'
+        )
+        self.db.commit()
+
+    def append(self, result):
+        device = result['device']
+        with self.lock:
+            cursor = self.db.execute(
+                f'INSERT INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    device['ip_address'],
+                    int(result['successful']),
+                    device.get('connection_type'),
+                    device.get('hostname'),
+                    device.get('exception'),
+                    json.dumps(device, default=str),
+                    json.dumps(result['output'], default=str)
+                )
+            )
+            self.pending += 1
+            if self.pending >= self.commit_every:
+                self.db.commit()
+                self.pending = 0
+            return cursor.lastrowid
+
+    def load(self, key):
+        return next(self.select('rowid = ?', (key,)))
+
+    def results(self):
+        return self.select()
+
+    def select(self, where='1', params=()):
+        """
+        Lazily yields device results matching SQL where clause
+
+        :param where: SQL where clause, e.g. 'successful = 0' or 'hostname LIKE ?'
+        :param params: Parameters of where clause
+        :return: Iterator of device results
+        """
+        with self.lock:
+            self.db.commit()
+            self.pending = 0
+            cursor = self.db.execute(
+                f'SELECT successful, device, output FROM {self.table} WHERE {where} ORDER BY rowid', params
+            )
+        for successful, device, output in cursor:
+            yield {
+                'device': json.loads(device),
+                'output': json.loads(output),
+                'successful': bool(successful)
+            }
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.commit()
+                self.db.close()
+                self.db = None
@@ -0,0 +1,34 @@
+from random import uniform
+
+
+class RetryPolicy:
+    """
+    Bounded retry policy with exponential backoff and full jitter for device sessions
+
+    :param max_attempts: Max number of function attempts per device, including the first
+    :param base_delay: Seconds to wait before the first retry
+    :param max_delay: Max seconds to wait between retries
+    :param jitter: Bool to randomize delay between 0 and the backoff delay
+    """
+    def __init__(self, max_attempts=3, base_delay=1, max_delay=30, jitter=True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """
+        :param attempt: Number of attempt about to be made, starting at 2 for the first retry
+        :return: Seconds to wait before attempt
+        """
+        backoff = min(self.max_delay, self.base_delay * 2 ** max(attempt - 2, 0))
+        if self.jitter:
+            return uniform(0, backoff)
+        return backoff
+
+    def exhausted(self, attempt):
+        """
+        :param attempt: Number of attempts already made
+        :return: Bool if no retries are left
+        """
+        return attempt >= self.max_attempts
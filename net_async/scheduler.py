@@ -0,0 +1,293 @@
+import json
+import os
+from ipaddress import ip_network
+from itertools import zip_longest
+from threading import Condition, Lock
+from time import monotonic, sleep
+from net_async.exceptions import InputError
+from net_async.metrics import DEVICE_PHASES, MetricsHook
+
+BACKOFF_EXCEPTIONS = ('NetmikoTimeoutException', 'TimeoutError', 'timeout', 'ReadTimeout')
+"""Failed device exceptions counted as timeouts by adaptive scheduling"""
+
+DURATION_WEIGHTS = {'failed': 2.0, 'unknown': 2.0, 'telnet': 1.5, 'nxos': 1.5}
+"""
+Multipliers of the median known duration estimating devices without duration history\n
+failed: Device failed on its last run\n
+unknown: Device has no fingerprint, so device type autodetection runs\n
+telnet: Fingerprint connection type is TELNET\n
+nxos: Fingerprint device type is NX-OS
+"""
+
+
+class DurationHistory(MetricsHook):
+    """
+    Learns per device session durations used by Scheduler to start the longest devices first\n
+    Provided as a hook, each device's total time (setup, function and disconnect) is recorded as an exponentially
+    weighted moving average and saved when the run completes.\n
+    Example duration:
+        {
+            'ewma': 12.5,\n
+            'failed': False\n
+        }
+
+    :param path: Optional location of .json file to persist durations across runs
+    :param alpha: Smoothing factor of exponentially weighted moving average
+    """
+    def __init__(self, path=None, alpha=0.5):
+        self.path = path
+        self.alpha = alpha
+        self.durations = {}
+        """Dictionary of durations keyed by management IP address"""
+        self.lock = Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as file:
+                    self.durations = json.load(file)
+            except (ValueError, OSError):
+                self.durations = {}
+
+    def device_completed(self, ip_address, timings, successful):
+        seconds = sum(timings.get(phase, 0.0) for phase in DEVICE_PHASES)
+        with self.lock:
+            duration = self.durations.setdefault(ip_address, {'ewma': None, 'failed': False})
+            duration['failed'] = not successful
+            if seconds > 0:
+                if duration['ewma'] is None:
+                    duration['ewma'] = seconds
+                else:
+                    duration['ewma'] = self.alpha * seconds + (1 - self.alpha) * duration['ewma']
+
+    def run_completed(self, report):
+        self.save()
+
+    def duration(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        :return: Expected seconds of device session or None if never timed
+        """
+        with self.lock:
+            return self.durations.get(ip_address, {}).get('ewma')
+
+    def failed(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        :return: Bool if device failed on its last run
+        """
+        with self.lock:
+            return self.durations.get(ip_address, {}).get('failed', False)
+
+    def save(self):
+        """Writes durations to file if path was provided"""
+        if self.path is None:
+            return
+        with self.lock:
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(self.durations, file)
+            os.replace(temp_path, self.path)
+
+
+class Scheduler:
+    """
+    Controls when device sessions start: dispatch order, global and per group concurrency limits, connection rate
+    limit and adaptive backoff\n
+    Longest first ordering starts the devices expected to take longest first, so slow WAN or TELNET devices do not
+    start last and stretch the run after other workers go idle. Expected durations come from history, devices
+    without history are estimated from the median known duration and DURATION_WEIGHTS.\n
+    Groups share a bottleneck such as a WAN link, site or AAA server. group_by may be:
+        int: Subnet prefix length, e.g. 24 groups devices by /24\n
+        dict: Group name keyed by management IP address, devices not in dict are only globally limited\n
+        callable: Function returning group name of a management IP address\n
+    Adaptive mode keeps an EWMA of the timeout rate of finished devices. When it exceeds backoff_threshold the
+    global limit is halved (at most once per cooldown), otherwise each successful device raises it by 1/limit up to
+    max_sessions.
+
+    :param max_sessions: Max number of concurrent sessions, None for no limit beyond threads
+    :param group_by: Subnet prefix length, dict or callable assigning devices to groups
+    :param group_limits: Dictionary of max concurrent sessions keyed by group name
+    :param default_group_limit: Max concurrent sessions of groups not in group_limits, None for no limit
+    :param rate: Max new sessions per second, None for no limit
+    :param burst: Number of sessions that can start at once before rate applies
+    :param adaptive: Bool to lower global limit when timeouts rise, requires max_sessions
+    :param min_sessions: Lowest global limit adaptive mode backs off to
+    :param backoff_threshold: Timeout rate above which adaptive mode backs off
+    :param backoff_exceptions: Failed device exceptions counted as timeouts
+    :param cooldown: Min seconds between adaptive backoffs
+    :param longest_first: Bool to order devices by expected duration, longest first
+    :param history: DurationHistory of previous runs, also provide it as a hook to keep it up to date
+    :param fingerprint_cache: FingerprintCache used to estimate devices without duration history
+    :param duration_weights: Dictionary of multipliers estimating devices without duration history
+    """
+    def __init__(self, max_sessions=None, group_by=None, group_limits=None, default_group_limit=None, rate=None,
+                 burst=1, adaptive=False, min_sessions=1, backoff_threshold=0.1,
+                 backoff_exceptions=BACKOFF_EXCEPTIONS, cooldown=5, longest_first=False, history=None,
+                 fingerprint_cache=None, duration_weights=DURATION_WEIGHTS):
+        if adaptive and max_sessions is None:
+            raise InputError('Adaptive scheduling requires max_sessions')
+        self.max_sessions = max_sessions
+        self.group_by = group_by
+        self.group_limits = group_limits if group_limits is not None else {}
+        self.default_group_limit = default_group_limit
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.min_sessions = min_sessions
+        self.backoff_threshold = backoff_threshold
+        self.backoff_exceptions = backoff_exceptions
+        self.cooldown = cooldown
+        self.longest_first = longest_first
+        self.history = history
+        self.fingerprint_cache = fingerprint_cache
+        self.duration_weights = duration_weights
+        self.limit = max_sessions
+        """Current global limit, lowered and raised by adaptive mode"""
+        self.timeout_rate = 0.0
+        """EWMA of timed out devices"""
+        self.active = 0
+        self.group_active = {}
+        self.tokens = burst
+        self.last_refill = monotonic()
+        self.last_backoff = monotonic() - cooldown
+        self.condition = Condition()
+        self.token_lock = Lock()
+
+    def group(self, ip_address):
+        """
+        :param ip_address: Management IP address of device
+        :return: Group name of device or None if ungrouped
+        """
+        if self.group_by is None:
+            return None
+        elif isinstance(self.group_by, int):
+            return str(ip_network(f'{ip_address}/{self.group_by}', strict=False))
+        elif isinstance(self.group_by, dict):
+            return self.group_by.get(ip_address)
+        return self.group_by(ip_address)
+
+    def estimate(self, ip_address, default=1.0):
+        """
+        :param ip_address: Management IP address of device
+        :param default: Seconds assumed for devices without duration history before weights apply
+        :return: Expected seconds of device session
+        """
+        if self.history is not None:
+            duration = self.history.duration(ip_address)
+            if duration is not None:
+                return duration
+            elif self.history.failed(ip_address):
+                default *= self.duration_weights['failed']
+        if self.fingerprint_cache is not None:
+            fingerprint = self.fingerprint_cache.get(ip_address)
+            if fingerprint is None:
+                default *= self.duration_weights['unknown']
+            else:
+                if fingerprint['con_type'] == 'TELNET':
+                    default *= self.duration_weights['telnet']
+                if 'nxos' in fingerprint['device_type']:
+                    default *= self.duration_weights['nxos']
+        return default
+
+    def order(self, mgmt_ips):
+        """
+        Sorts devices longest first if enabled, then interleaves devices of groups with a concurrency limit so a
+        large group does not hold every worker waiting on its limit. Devices of unlimited groups keep their position.
+
+        :param mgmt_ips: Management IP addresses for devices
+        :return: List of management IP addresses in dispatch order
+        """
+        if self.longest_first:
+            known = []
+            if self.history is not None:
+                known = sorted(
+                    duration for duration in map(self.history.duration, mgmt_ips) if duration is not None
+                )
+            default = known[len(known) // 2] if known else 1.0
+            mgmt_ips = sorted(mgmt_ips, key=lambda ip_address: self.estimate(ip_address, default), reverse=True)
+        groups = {}
+        positions = []
+        for position, ip_address in enumerate(mgmt_ips):
+            group = self.group(ip_address)
+            if group is not None and self.group_limits.get(group, self.default_group_limit) is not None:
+                groups.setdefault(group, []).append(ip_address)
+                positions.append(position)
+        if len(groups) < 2:
+            return list(mgmt_ips)
+        mgmt_ips = list(mgmt_ips)
+        interleaved = (ip_address for batch in zip_longest(*groups.values()) for ip_address in batch if ip_address)
+        for position, ip_address in zip(positions, interleaved):
+            mgmt_ips[position] = ip_address
+        return mgmt_ips
+
+    def concurrency(self):
+        """
+        :return: Current global limit or None if unlimited
+        """
+        if self.limit is None:
+            return None
+        return max(int(self.limit), self.min_sessions)
+
+    def available(self, group):
+        """
+        :param group: Group name of device
+        :return: Bool if a session of group can start without exceeding limits
+        """
+        limit = self.concurrency()
+        if limit is not None and self.active >= limit:
+            return False
+        if group is not None:
+            group_limit = self.group_limits.get(group, self.default_group_limit)
+            if group_limit is not None and self.group_active.get(group, 0) >= group_limit:
+                return False
+        return True
+
+    def acquire(self, ip_address):
+        """
+        Blocks until a session to device can start within concurrency and rate limits
+
+        :param ip_address: Management IP address of device
+        """
+        group = self.group(ip_address)
+        with self.condition:
+            while not self.available(group):
+                self.condition.wait()
+            self.active += 1
+            self.group_active[group] = self.group_active.get(group, 0) + 1
+        if self.rate is not None:
+            # Reserves a token, waiting for the bucket to refill if it is already spent
+            with self.token_lock:
+                now = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate) - 1
+                self.last_refill = now
+                wait = -self.tokens / self.rate
+            if wait > 0:
+                sleep(wait)
+
+    def release(self, ip_address, result=None):
+        """
+        :param ip_address: Management IP address of device
+        :param result: Device result used by adaptive mode, None if session raised
+        """
+        group = self.group(ip_address)
+        with self.condition:
+            self.active -= 1
+            self.group_active[group] -= 1
+            if self.adaptive and result is not None:
+                self.adapt(result)
+            self.condition.notify_all()
+
+    def adapt(self, result):
+        """
+        Additive increase, multiplicative decrease of global limit from device result
+
+        :param result: Device result
+        """
+        timed_out = not result['successful'] and result['device'].get('exception') in self.backoff_exceptions
+        self.timeout_rate += 0.1 * (timed_out - self.timeout_rate)
+        now = monotonic()
+        if timed_out:
+            if self.timeout_rate > self.backoff_threshold and now - self.last_backoff >= self.cooldown:
+                self.limit = max(self.limit / 2, self.min_sessions)
+                self.last_backoff = now
+        elif result['successful']:
+            self.limit = min(self.limit + 1 / self.limit, self.max_sessions)
@@ -0,0 +1,306 @@
+import os
+import queue
+import socket
+from collections import Counter, deque
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+from logging import exception
+from threading import Lock, Thread
+from net_async.handlers import SessionHandler, unconnected_device
+from net_async.prescan import reachability_scan
+from net_async.metrics import RunReport
+from net_async.exceptions import InputError
+
+
+class WorkQueueServer:
+    """
+    Work queue of management IP address batches served to worker processes on this or other hosts\n
+    Workers connect with run_worker() using the same address and authkey, pull batches until the queue is empty
+    and put successful_devices, failed_devices and outputs of each finished device on the results queue. Workers
+    announce each batch they pull on the claims queue, so devices of local workers that exit without a result can be
+    failed.
+
+    :param mgmt_ips: Management IP addresses for devices
+    :param address: (host, port) to listen on, port 0 selects a free port
+    :param authkey: Bytes key workers must present
+    :param batch_size: Number of management IP addresses per batch
+    """
+    def __init__(self, mgmt_ips, address=('127.0.0.1', 0), authkey=None, batch_size=50):
+        self.mgmt_ips = list(mgmt_ips)
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.claims = queue.Queue()
+        for idx in range(0, len(self.mgmt_ips), batch_size):
+            self.tasks.put(self.mgmt_ips[idx:idx + batch_size])
+
+        manager = type('WorkQueueManager', (BaseManager,), {})
+        manager.register('tasks', callable=lambda: self.tasks)
+        manager.register('results', callable=lambda: self.results)
+        manager.register('claims', callable=lambda: self.claims)
+        self.server = manager(address=address, authkey=self.authkey).get_server()
+        self.address = self.server.address
+        """(host, port) server is listening on"""
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """Starts serving batches in a background thread"""
+        self.thread.start()
+
+    def stop(self):
+        """Stops serving batches"""
+        self.server.stop_event.set()
+
+    def collect(self, timeout=None, workers=(), poll_interval=1):
+        """
+        Generator yielding results put by workers until all management IP addresses have a result\n
+        Batches pulled by a local worker that exits without putting a result (crash, out of memory, etc.) are
+        yielded as failed devices with exception 'WorkerExited'. When every local worker has exited, batches no
+        worker pulled are failed the same way, batches pulled by remote workers are still waited on.
+
+        :param timeout: Seconds to wait for each batch result, None waits indefinitely
+        :param workers: Local worker Processes
+        :param poll_interval: Seconds between checks of local workers
+        :return: Iterator of (successful_devices, failed_devices, outputs)
+        """
+        remaining = Counter(self.mgmt_ips)
+        outstanding = len(self.mgmt_ips)
+        claimed = {}
+        hostname = socket.gethostname()
+        waited = 0
+        while outstanding > 0:
+            exited = [worker for worker in workers if worker.exitcode is not None]
+            batch_results = []
+            try:
+                batch_results.append(self.results.get(timeout=poll_interval))
+            except queue.Empty:
+                waited += poll_interval
+                if timeout is not None and waited >= timeout:
+                    raise
+            # Results put before a worker exited are already queued, so they are drained before failing its batches
+            while True:
+                try:
+                    batch_results.append(self.results.get_nowait())
+                except queue.Empty:
+                    break
+            while True:
+                try:
+                    worker_id, batch = self.claims.get_nowait()
+                except queue.Empty:
+                    break
+                claimed.setdefault(tuple(worker_id), []).extend(batch)
+            for successful_devices, failed_devices, outputs in batch_results:
+                waited = 0
+                for device in successful_devices + failed_devices:
+                    remaining[device['ip_address']] -= 1
+                outstanding -= len(successful_devices) + len(failed_devices)
+                yield successful_devices, failed_devices, outputs
+
+            lost = [
+                ip_address for worker in exited for ip_address in claimed.pop((hostname, worker.pid), [])
+            ]
+            if workers and len(exited) == len(workers):
+                while True:
+                    try:
+                        lost.extend(self.tasks.get_nowait())
+                    except queue.Empty:
+                        break
+            failed_devices = []
+            for ip_address in lost:
+                if remaining[ip_address] > 0:
+                    remaining[ip_address] -= 1
+                    failed_devices.append(unconnected_device(ip_address, 'WorkerExited'))
+            if failed_devices:
+                waited = 0
+                outstanding -= len(failed_devices)
+                yield [], failed_devices, []
+
+
+def run_worker(address, authkey, username, password, function, enable_pw='', threads=100, prescan=False,
+               prescan_timeout=3, **session_args):
+    """
+    Pulls batches from a WorkQueueServer and runs their devices on one long lived thread pool until the queue is
+    empty\n
+    Threads take devices one at a time and the next batch is pulled as soon as a thread finds no device left, so
+    every thread stays busy and no thread waits on the slowest device of a batch. Each device result is put on the
+    results queue as soon as its session completes.
+
+    :param address: (host, port) of WorkQueueServer
+    :param authkey: Bytes key of WorkQueueServer
+    :param username: Device management username
+    :param password: Device management password
+    :param function: Function to run on each device, outputs must be picklable
+    :param enable_pw: Devices' Enable Password
+    :param threads: Max number of concurrent device sessions of this worker
+    :param prescan: Bool to TCP probe SSH and TELNET ports of each batch before opening sessions
+    :param prescan_timeout: Seconds to wait for each pre-scan TCP connection
+    :param session_args: Additional session arguments (verbose, privilege_check, retry_policy, scheduler, etc.),
+        except output_store which is applied by the coordinator
+    """
+    if 'output_store' in session_args:
+        raise InputError('output_store is applied by the coordinator, workers would each save their own index')
+    manager = type('WorkQueueClient', (BaseManager,), {})
+    manager.register('tasks')
+    manager.register('results')
+    manager.register('claims')
+    client = manager(address=tuple(address), authkey=authkey)
+    client.connect()
+    tasks = client.tasks()
+    results = client.results()
+    claims = client.claims()
+    worker_id = (socket.gethostname(), os.getpid())
+    handler = SessionHandler(username, password, function, enable_pw, **session_args)
+    pending = deque()
+    lock = Lock()
+
+    def put(result):
+        try:
+            if result['successful']:
+                results.put(([result['device']], [], [{'device': result['device'], 'output': result['output']}]))
+            else:
+                results.put(([], [result['device']], []))
+        except Exception as e:
+            # Outputs that can not be pickled fail the device instead of the worker
+            exception(e)
+            results.put(([], [unconnected_device(result['device']['ip_address'], type(e).__name__)], []))
+
+    def next_ip_address():
+        with lock:
+            while not pending:
+                try:
+                    batch = tasks.get_nowait()
+                except queue.Empty:
+                    return None
+                claims.put((worker_id, batch))
+                if prescan:
+                    transports = reachability_scan(
+                        batch, prescan_timeout, ssh_port=handler.connection_args['ssh_port'],
+                        telnet_port=handler.connection_args['telnet_port']
+                    )
+                    handler.transports.update(transports)
+                    for ip_address in batch:
+                        if ip_address in transports and transports[ip_address] is None:
+                            put({'device': unconnected_device(ip_address, 'Unreachable'), 'successful': False})
+                    batch = [ip_address for ip_address in batch if transports.get(ip_address, '') is not None]
+                if handler.scheduler is not None:
+                    batch = handler.scheduler.order(batch)
+                pending.extend(batch)
+            return pending.popleft()
+
+    def work():
+        while True:
+            ip_address = next_ip_address()
+            if ip_address is None:
+                return
+            try:
+                result = handler(ip_address)
+            except Exception as e:
+                exception(e)
+                result = {'device': unconnected_device(ip_address, type(e).__name__), 'successful': False}
+            put(result)
+
+    workers = [Thread(target=work, daemon=True) for _ in range(threads)]
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        for store in ('fingerprint_cache', 'latency_tracker'):
+            if session_args.get(store) is not None:
+                session_args[store].save()
+
+
+class ShardedSessions:
+    """
+    Manager of device connections sharded across worker processes\n
+    Same attributes and output format as AsyncSessions. Management IP addresses are served in batches from a
+    WorkQueueServer to local worker processes, each running one long lived thread pool that pulls the next batch as
+    threads free up. Workers on other hosts can join with run_worker() when address is reachable from them.\n
+    function and session_args are sent to worker processes, so they must be picklable on platforms that spawn
+    processes. Caches that write to a file (fingerprint_cache, latency_tracker) should not be shared across workers.
+
+    :param username: Device management username
+    :param password: Device management password
+    :param mgmt_ips: Management IP addresses for devices
+    :param function: Function to run on each device, outputs must be picklable
+    :param enable_pw: Devices' Enable Password
+    :param processes: Number of local worker processes, defaults to number of CPUs
+    :param batch_size: Number of management IP addresses per batch
+    :param address: (host, port) work queue listens on, port 0 selects a free port
+    :param authkey: Bytes key remote workers must present
+    :param hooks: List of MetricsHook called as batch results are collected
+    :param sink: ResultSink batch results are written to as they are collected, devices are kept in memory as
+        DeviceRecords and outputs is the sink
+    :param output_store: OutputStore marking successful devices changed or unchanged since its last run, applied as
+        batch results are collected and saved after run
+    :param session_args: Additional run_worker arguments (threads, prescan, verbose, privilege_check, etc.)
+    """
+    def __init__(self, username, password, mgmt_ips, function, enable_pw='', processes=None, batch_size=50,
+                 address=('127.0.0.1', 0), authkey=None, hooks=(), sink=None, output_store=None,
+                 **session_args):
+        self.successful_devices = []
+        """List of devices successfully connected"""
+        self.failed_devices = []
+        """List of failed that failed connectivity checks"""
+        self.outputs = [] if sink is None else sink
+        """List of dictionaries containing device info and function output"""
+        self.report = RunReport(hooks, keep_devices=sink is None)
+        """RunReport of per device phase timings, only aggregates are kept with a sink"""
+
+        try:
+            if len(mgmt_ips) == 0:
+                raise InputError('No Management IP Addresses found')
+        except TypeError:
+            raise InputError('No Management IP Addresses found')
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = max(min(processes, -(-len(mgmt_ips) // batch_size)), 1)
+
+        with WorkQueueServer(mgmt_ips, address, authkey, batch_size) as server:
+            self.address = server.address
+            """(host, port) remote workers can connect to while running"""
+            self.authkey = server.authkey
+            workers = [
+                Process(
+                    target=run_worker,
+                    args=(server.address, server.authkey, username, password, function, enable_pw),
+                    kwargs=session_args,
+                    daemon=True
+                ) for num in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for successful_devices, failed_devices, outputs in server.collect(workers=workers):
+                if output_store is not None:
+                    for output in outputs:
+                        output['device']['changed'] = output_store.changed(
+                            output['device']['ip_address'], output['output']
+                        )
+                if sink is not None:
+                    self.successful_devices.extend(sink.write(dict(output, successful=True)) for output in outputs)
+                    self.failed_devices.extend(
+                        sink.write({'device': device, 'output': None, 'successful': False})
+                        for device in failed_devices
+                    )
+                else:
+                    self.successful_devices.extend(successful_devices)
+                    self.failed_devices.extend(failed_devices)
+                    self.outputs.extend(outputs)
+                for device in successful_devices:
+                    self.report.add(device['ip_address'], device['timings'], True)
+                for device in failed_devices:
+                    self.report.add(device['ip_address'], device['timings'], False)
+            for worker in workers:
+                worker.join()
+        if output_store is not None:
+            output_store.save()
+        self.report.complete()
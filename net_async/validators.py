@@ -1,4 +1,47 @@
+import os
 import re
+import ipaddress
+
+IPV4 = re.compile(
+    r'(([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])\.){3}'
+    r'([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])'
+)
+
+IPV6 = re.compile(
+    r'(([0-9aA-fF]{1,4}:){7}[0-9aA-fF]{1,4}|'
+    r'([0-9aA-fF]{1,4}:){7}:|'
+    r'([0-9aA-fF]{1,4}:){1,6}:[0-9aA-fF]{1,4}|'
+    r'([0-9aA-fF]{1,4}:){1,5}(:[0-9aA-fF]{1,4}){1,2}|'
+    r'([0-9aA-fF]{1,4}:){1,4}(:[0-9aA-fF]{1,4}){1,3}|'
+    r'([0-9aA-fF]{1,4}:){1,3}(:[0-9aA-fF]{1,4}){1,4}|'
+    r'([0-9aA-fF]{1,4}:){1,2}(:[0-9aA-fF]{1,4}){1,5}|'
+    r'[0-9aA-fF]{1,4}:((:[0-9aA-fF]{1,4}){1,6})|'
+    r':((:[0-9aA-fF]{1,4}){1,7}|:)|'
+    r'fe80:(:[0-9aA-fF]{0,4}){0,4}%[0-9aA-zZ]+|::(ffff(:0{1,4})?:))'
+)
+
+DOTTED_MAC = re.compile(
+    r'(('
+    r'([0-9aA-fF]){4}|'
+    r'([0-9aA-fF]){3}([aA-fF0-9])|'
+    r'(([aA-fF0-9])([aA-fF0-9]){3})|'
+    r'((([0-9][aA-fF])|([aA-fF0-9])){2})|'
+    r'(([aA-fF0-9])([aA-fF0-9]){2}([aA-fF0-9])))\.){2}'
+    r'(([0-9aA-fF]){4})|'
+    r'(([0-9aA-fF]){3}([aA-fF0-9]))|'
+    r'(([aA-fF0-9])([aA-fF0-9]){3})|'
+    r'((([0-9][aA-fF])|([aA-fF][0-9])){2})|'
+    r'(([aA-fF0-9])([aA-fF0-9]){2}([aA-fF0-9]))'
+)
+
+MAC = re.compile(
+    r'(((([0-9aA-fF]){2}-){5}|'
+    r'(([0-9][aA-fF]|[aA-fF][0-9])-){5})'
+    r'(([0-9aA-fF]){2}|([0-9][aA-fF]|[aA-fF][0-9]){2}))|'
+    r'(((([0-9aA-fF]){2}:){5}|'
+    r'(([0-9][aA-fF]|[aA-Ff][0-9]):){5})'
+    r'(([0-9aA-fF]){2}|([0-9][aA-fF]|[aA-fF][0-9]){2}))'
+)
 
 
 def ipv4(address):
@@ -6,10 +49,7 @@ def ipv4(address):
     :param address: MAC Address
     :return: Bool if valid format
     """
-    if re.fullmatch(
-            r'(([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])\.){3}'
-            r'([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])'
-            r'', address):
+    if IPV4.fullmatch(address):
         return True
     else:
         return False
@@ -20,18 +60,7 @@ def ipv6(address):
     :param address: MAC Address
     :return: Bool if valid format
     """
-    if re.fullmatch(
-            r'(([0-9aA-fF]{1,4}:){7}[0-9aA-fF]{1,4}|'
-            r'([0-9aA-fF]{1,4}:){7}:|'
-            r'([0-9aA-fF]{1,4}:){1,6}:[0-9aA-fF]{1,4}|'
-            r'([0-9aA-fF]{1,4}:){1,5}(:[0-9aA-fF]{1,4}){1,2}|'
-            r'([0-9aA-fF]{1,4}:){1,4}(:[0-9aA-fF]{1,4}){1,3}|'
-            r'([0-9aA-fF]{1,4}:){1,3}(:[0-9aA-fF]{1,4}){1,4}|'
-            r'([0-9aA-fF]{1,4}:){1,2}(:[0-9aA-fF]{1,4}){1,5}|'
-            r'[0-9aA-fF]{1,4}:((:[0-9aA-fF]{1,4}){1,6})|'
-            r':((:[0-9aA-fF]{1,4}){1,7}|:)|'
-            r'fe80:(:[0-9aA-fF]{0,4}){0,4}%[0-9aA-zZ]+|::(ffff(:0{1,4})?:))'
-            r'', address):
+    if IPV6.fullmatch(address):
         return True
     else:
         return False
@@ -43,39 +72,68 @@ def macaddress(address):
     :return: Bool if valid format
     """
     if '.' in address:
-        if re.fullmatch(
-                r'(('
-                r'([0-9aA-fF]){4}|'
-                r'([0-9aA-fF]){3}([aA-fF0-9])|'
-                r'(([aA-fF0-9])([aA-fF0-9]){3})|'
-                r'((([0-9][aA-fF])|([aA-fF0-9])){2})|'
-                r'(([aA-fF0-9])([aA-fF0-9]){2}([aA-fF0-9])))\.){2}'
-                r'(([0-9aA-fF]){4})|'
-                r'(([0-9aA-fF]){3}([aA-fF0-9]))|'
-                r'(([aA-fF0-9])([aA-fF0-9]){3})|'
-                r'((([0-9][aA-fF])|([aA-fF][0-9])){2})|'
-                r'(([aA-fF0-9])([aA-fF0-9]){2}([aA-fF0-9]))'
-                r'', address):
+        if DOTTED_MAC.fullmatch(address):
             return True
         else:
             return False
     else:
-        if re.fullmatch(
-                r'(((([0-9aA-fF]){2}-){5}|'
-                r'(([0-9][aA-fF]|[aA-fF][0-9])-){5})'
-                r'(([0-9aA-fF]){2}|([0-9][aA-fF]|[aA-fF][0-9]){2}))|'
-                r'(((([0-9aA-fF]){2}:){5}|'
-                r'(([0-9][aA-fF]|[aA-Ff][0-9]):){5})'
-                r'(([0-9aA-fF]){2}|([0-9][aA-fF]|[aA-fF][0-9]){2}))'
-                r'', address):
+        if MAC.fullmatch(address):
             return True
         else:
             return False
 
 
+def expand_addresses(entry, max_hosts=65536):
+    """
+    :param entry: CIDR network (10.0.0.0/24) or range (10.0.0.1-10.0.0.50 or 10.0.0.1-50)
+    :param max_hosts: Max number of addresses entry may expand to
+    :return: List of host IP addresses, empty if entry is invalid or exceeds max_hosts
+    """
+    try:
+        if '/' in entry:
+            network = ipaddress.ip_network(entry, strict=False)
+            if network.num_addresses > max_hosts + 2:
+                return []
+            return [str(host) for host in network.hosts()] or [str(network.network_address)]
+        start, end = entry.split('-')
+        start = ipaddress.ip_address(start.strip())
+        end = end.strip()
+        if end.isdigit() and start.version == 4:
+            end = str(start).rsplit('.', 1)[0] + '.' + end
+        end = ipaddress.ip_address(end)
+        if start.version != end.version or not 0 <= int(end) - int(start) < max_hosts:
+            return []
+        return [str(type(start)(num)) for num in range(int(start), int(end) + 1)]
+    except ValueError:
+        return []
+
+
+def canonical(ip_address):
+    """
+    :param ip_address: IP address string
+    :return: Compressed lower case form of IPv6 address, other input unchanged
+    """
+    if ':' in str(ip_address):
+        try:
+            return str(ipaddress.ip_address(str(ip_address).strip()))
+        except ValueError:
+            pass
+    return ip_address
+
+
 class MgmtIPAddresses:
-    """Input .txt file location containing list of management IP addresses"""
-    def __init__(self, mgmt_file_location):
+    """
+    Input .txt file location containing list of management IP addresses\n
+    Optionally expands CIDR networks (10.0.0.0/24) and ranges (10.0.0.1-10.0.0.50 or 10.0.0.1-50), accepts IPv6
+    addresses and drops duplicate addresses. Supports len(), iteration and constant time membership tests.
+
+    :param mgmt_file_location: Path of file, or iterable of lines
+    :param expand: Bool to expand CIDR networks and ranges into host addresses
+    :param allow_ipv6: Bool to accept IPv6 addresses
+    :param dedup: Bool to drop duplicate addresses
+    :param max_hosts: Max number of addresses a single network or range may expand to
+    """
+    def __init__(self, mgmt_file_location, expand=False, allow_ipv6=False, dedup=False, max_hosts=65536):
         self.mgmt_ips = []
         """Formatted set of validated IP addresses"""
         self.invalid_line_nums = []
@@ -84,26 +142,82 @@ class MgmtIPAddresses:
         """Set of invalid IP addresses"""
         self.valid = True
         """Bool of management IP address file input validation"""
-        with open(mgmt_file_location) as file:
-            for idx, address in enumerate(file):
-                ip_address = str(address).strip('\n')
-                if ipv4(ip_address) is False:
-                    self.invalid_line_nums.append(str(idx + 1))
-                    self.invalid_ip_addresses.append(str(address))
-                    self.valid = False
-                    """Bool of management IP address file input validation"""
+        self.duplicates = []
+        """List of duplicate IP addresses dropped"""
+        self.index = {}
+        """Dictionary of first line number keyed by IP address"""
+        self.expand = expand
+        self.allow_ipv6 = allow_ipv6
+        self.dedup = dedup
+        self.max_hosts = max_hosts
+        if isinstance(mgmt_file_location, (str, os.PathLike)):
+            with open(mgmt_file_location) as file:
+                self.load(file)
+        else:
+            self.load(mgmt_file_location)
+
+    def __contains__(self, ip_address):
+        return canonical(ip_address) in self.index
+
+    def __iter__(self):
+        return iter(self.mgmt_ips)
+
+    def __len__(self):
+        return len(self.mgmt_ips)
+
+    def load(self, lines):
+        """
+        Validates and adds management IP addresses
+
+        :param lines: Iterable of lines, each an IP address, or a CIDR network or range if expand is True
+        """
+        ipv4_match = IPV4.fullmatch
+        ipv6_match = IPV6.fullmatch if self.allow_ipv6 else None
+        index = self.index
+        mgmt_ips = self.mgmt_ips
+        for idx, address in enumerate(lines):
+            ip_address = str(address).strip()
+            if ipv4_match(ip_address):
+                addresses = (ip_address,)
+            elif ipv6_match is not None and ipv6_match(ip_address):
+                # IPv6 has many spellings of one address, keyed on the compressed lower case form
+                addresses = (canonical(ip_address),)
+            elif self.expand and ('/' in ip_address or '-' in ip_address):
+                # IPv6 networks and ranges are only expanded when IPv6 addresses are accepted
+                if self.allow_ipv6 or ':' not in ip_address:
+                    addresses = expand_addresses(ip_address, self.max_hosts)
+                else:
+                    addresses = ()
+            else:
+                addresses = ()
+            if not addresses:
+                self.invalid_line_nums.append(str(idx + 1))
+                self.invalid_ip_addresses.append(str(address))
+                self.valid = False
+                continue
+            for ip_address in addresses:
+                if ip_address in index:
+                    if self.dedup:
+                        self.duplicates.append(ip_address)
+                        continue
                 else:
-                    self.mgmt_ips.append(ip_address)
+                    index[ip_address] = idx + 1
+                mgmt_ips.append(ip_address)
 
 
 class BugCheck:
+    """
+    Finds management IP addresses missing from both successful and failed devices
+
+    :param successful_devices: List of successful devices
+    :param failed_devices: List of failed devices
+    :param mgmt_ips: Management IP addresses for devices
+    """
     def __init__(self, successful_devices, failed_devices, mgmt_ips):
         if len(successful_devices) + len(failed_devices) != len(mgmt_ips):
-            self.bug_devices = []
-            for ip in mgmt_ips:
-                if all(ip != s_device['ip_address'] for s_device in successful_devices) and \
-                        all(ip != f_device['ip_address'] for f_device in failed_devices):
-                    self.bug_devices.append(ip)
+            finished = {device['ip_address'] for device in successful_devices}
+            finished.update(device['ip_address'] for device in failed_devices)
+            self.bug_devices = [ip for ip in mgmt_ips if ip not in finished]
             self.bug = True
         else:
             self.bug = False
@@ -0,0 +1,44 @@
+import os
+
+from net_async.changes import OutputStore
+
+
+def blob_count(path):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(path, 'blobs')))
+
+
+def test_changed_device_keeps_previous_output_after_save(tmp_path):
+    with OutputStore(tmp_path) as store:
+        assert store.changed('10.0.0.1', 'v1')
+    store = OutputStore(tmp_path)
+    assert store.changed('10.0.0.1', 'v2')
+    assert store.previous('10.0.0.1') == 'v1'
+    store.save()
+    assert store.previous('10.0.0.1') == 'v1'
+    store = OutputStore(tmp_path)
+    assert store.previous('10.0.0.1') == 'v2'
+
+
+def test_unchanged_device_and_stale_blobs(tmp_path):
+    for output in ('v1', 'v2', 'v2'):
+        with OutputStore(tmp_path) as store:
+            store.changed('10.0.0.1', output)
+    assert not store.changed('10.0.0.1', 'v2')
+    assert blob_count(tmp_path) == 1
+
+
+def test_failed_device_keeps_previous_hashes(tmp_path):
+    with OutputStore(tmp_path) as store:
+        store.changed('10.0.0.1', {'show version': 'v1', 'show inventory': 'i1'})
+    with OutputStore(tmp_path):
+        pass
+    store = OutputStore(tmp_path)
+    assert store.previous('10.0.0.1', 'show inventory') == 'i1'
+    assert not store.changed('10.0.0.1', {'show version': 'v1', 'show inventory': 'i1'})
+
+
+def test_hashes_only(tmp_path):
+    with OutputStore(tmp_path, store_outputs=False) as store:
+        store.changed('10.0.0.1', 'v1')
+    assert blob_count(tmp_path) == 0
+    assert OutputStore(tmp_path, store_outputs=False).previous('10.0.0.1') is None
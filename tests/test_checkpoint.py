@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from net_async.aio import AsyncioSessions
+from net_async.checkpoint import Checkpoint
+from net_async.handlers import AsyncSessions, unconnected_device
+
+CLOSED_PORT = 1
+"""Port refused by 127.0.0.0/8 hosts so unfinished devices fail the pre-scan without a session"""
+
+
+def successful_result(ip_address, output='output'):
+    device = dict(unconnected_device(ip_address, 'None'), connectivity=True, timings={'setup': 1.0})
+    return {'device': device, 'output': output, 'successful': True}
+
+
+def failed_result(ip_address):
+    return {'device': unconnected_device(ip_address, 'NetmikoTimeoutException'), 'output': None, 'successful': False}
+
+
+def journal(path, *results):
+    with Checkpoint(path) as checkpoint:
+        checkpoint.open()
+        for result in results:
+            checkpoint.write(result)
+
+
+def lines(path):
+    with open(path, 'rb') as file:
+        return file.read().splitlines(keepends=True)
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1'), successful_result('127.0.0.2'))
+    with open(path, 'ab') as file:
+        file.write(b'{"device": {"ip_address": "127.0.0.3"')
+    with Checkpoint(path) as checkpoint:
+        assert list(checkpoint.open(resume=True)) == ['127.0.0.1', '127.0.0.2']
+        checkpoint.write(successful_result('127.0.0.3'))
+    assert [json.loads(line)['device']['ip_address'] for line in lines(path)] == ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+
+
+def test_complete_line_without_newline_is_truncated(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1'))
+    with open(path, 'ab') as file:
+        file.write(json.dumps(successful_result('127.0.0.2')).encode())
+    with Checkpoint(path) as checkpoint:
+        assert list(checkpoint.open(resume=True)) == ['127.0.0.1']
+    assert len(lines(path)) == 1
+
+
+def test_open_without_resume_truncates(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1'))
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.open() == {}
+    assert lines(path) == []
+
+
+def test_retry_failed_replays_failed_devices(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1'), failed_result('127.0.0.2'))
+    with Checkpoint(path) as checkpoint:
+        assert list(checkpoint.open(resume=True)) == ['127.0.0.1', '127.0.0.2']
+    with Checkpoint(path, retry_failed=True) as checkpoint:
+        assert list(checkpoint.open(resume=True)) == ['127.0.0.1']
+        checkpoint.write(successful_result('127.0.0.2'))
+    with Checkpoint(path, retry_failed=True) as checkpoint:
+        assert checkpoint.open(resume=True)['127.0.0.2']['successful']
+
+
+def test_unserializable_output_is_journaled_as_string(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1', output={'ips': {1, 2}}))
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.open(resume=True)['127.0.0.1']['output'] == {'ips': '{1, 2}'}
+
+
+def run_sessions(sessions_class, path, mgmt_ips, retry_failed=False):
+    def function(session):
+        raise AssertionError('Journaled devices must not be run again')
+    return sessions_class(
+        'username', 'password', mgmt_ips, function, checkpoint=Checkpoint(path, retry_failed=retry_failed),
+        resume=True, prescan=True, prescan_timeout=1, ssh_port=CLOSED_PORT, telnet_port=CLOSED_PORT
+    )
+
+
+@pytest.mark.parametrize('sessions_class', [AsyncSessions, AsyncioSessions])
+def test_sessions_resume_from_journal(tmp_path, sessions_class):
+    path = tmp_path / 'checkpoint.jsonl'
+    journal(path, successful_result('127.0.0.1'), failed_result('127.0.0.2'))
+    sessions = run_sessions(sessions_class, path, ['127.0.0.1', '127.0.0.2', '127.0.0.3'])
+    assert [output['device']['ip_address'] for output in sessions.outputs] == ['127.0.0.1']
+    assert sorted(device['ip_address'] for device in sessions.failed_devices) == ['127.0.0.2', '127.0.0.3']
+    assert sorted(sessions.report.devices) == ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+    assert len(lines(path)) == 3
+
+    sessions = run_sessions(sessions_class, path, ['127.0.0.1', '127.0.0.2', '127.0.0.3'], retry_failed=True)
+    assert [device['exception'] for device in sessions.failed_devices] == ['Unreachable', 'Unreachable']
+    assert len(lines(path)) == 5
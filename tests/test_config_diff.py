@@ -0,0 +1,104 @@
+from net_async.config_diff import config_diff, config_tree
+
+RUNNING_CONFIG = """Building configuration...
+
+Current configuration : 1234 bytes
+!
+version 15.2
+hostname R1
+!
+banner motd ^C
+Authorized access only
+^C
+interface GigabitEthernet0/1
+ description uplink
+ ip address 10.0.0.1 255.255.255.0
+ shutdown
+!
+interface GigabitEthernet0/2
+ description old
+!
+router bgp 65000
+ neighbor 10.0.0.2 remote-as 65001
+ address-family ipv4
+  neighbor 10.0.0.2 activate
+ exit-address-family
+!
+no ip http server
+end
+"""
+
+
+def test_running_config_includes_itself():
+    assert config_diff(RUNNING_CONFIG, RUNNING_CONFIG) == []
+
+
+def test_configured_lines_are_dropped():
+    assert config_diff(RUNNING_CONFIG, ['hostname R1', 'interface GigabitEthernet0/1', ' description uplink']) == []
+
+
+def test_changed_line_is_sent():
+    assert config_diff(RUNNING_CONFIG, ['hostname R2']) == ['hostname R2']
+
+
+def test_missing_child_is_sent_under_parent():
+    candidate = ['interface GigabitEthernet0/2', ' description new']
+    assert config_diff(RUNNING_CONFIG, candidate) == candidate
+
+
+def test_new_parent_is_sent_with_children():
+    candidate = ['interface GigabitEthernet0/3', ' description added', ' switchport mode access']
+    assert config_diff(RUNNING_CONFIG, candidate) == candidate
+
+
+def test_nested_child_is_sent_under_all_parents():
+    candidate = ['router bgp 65000', ' address-family ipv4', '  neighbor 10.0.0.2 activate',
+                 '  neighbor 10.0.0.3 activate']
+    assert config_diff(RUNNING_CONFIG, candidate) == [
+        'router bgp 65000', ' address-family ipv4', '  neighbor 10.0.0.3 activate'
+    ]
+
+
+def test_no_lines_disabling_hidden_defaults_are_sent():
+    candidate = ['no cdp run', 'no ip domain lookup', 'no service pad']
+    assert config_diff(RUNNING_CONFIG, candidate) == candidate
+
+
+def test_no_line_removing_configured_command_is_sent():
+    candidate = ['interface GigabitEthernet0/1', ' no shutdown', ' no ip address']
+    assert config_diff(RUNNING_CONFIG, candidate) == candidate
+
+
+def test_configured_no_line_is_dropped():
+    assert config_diff(RUNNING_CONFIG, ['no ip http server']) == []
+
+
+def test_banner_compared_as_block():
+    assert config_diff(RUNNING_CONFIG, ['banner motd #', 'Authorized access only', '#']) == []
+    assert config_diff(RUNNING_CONFIG, ['banner motd #', 'Keep out', '#']) == ['banner motd #', 'Keep out', '#']
+
+
+def test_white_space_and_navigation_are_ignored():
+    candidate = 'interface   GigabitEthernet0/1\r\n  description   uplink\r\nexit\r\n!\r\n'
+    assert config_diff(RUNNING_CONFIG, candidate) == []
+
+
+def test_config_tree_hierarchy():
+    tree = config_tree(RUNNING_CONFIG)
+    assert 'version 15.2' in tree
+    assert 'Building configuration...' not in tree
+    children = tree['router bgp 65000'][1]
+    assert list(children['address-family ipv4'][1]) == ['neighbor 10.0.0.2 activate']
+
+
+def test_flat_block_is_pushed_in_full():
+    assert config_diff(RUNNING_CONFIG, ['interface GigabitEthernet0/1', 'description new']) == [
+        'interface GigabitEthernet0/1', 'description new'
+    ]
+    candidate = ['hostname R1', 'interface GigabitEthernet0/9', 'description added', 'no ip http server']
+    assert config_diff(RUNNING_CONFIG, candidate) == candidate
+
+
+def test_childless_block_commands():
+    assert config_diff(RUNNING_CONFIG, ['hostname R1', 'interface GigabitEthernet0/1']) == []
+    assert config_diff(RUNNING_CONFIG, ['interface GigabitEthernet0/9']) == ['interface GigabitEthernet0/9']
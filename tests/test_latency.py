@@ -0,0 +1,75 @@
+import pytest
+
+from net_async.handlers import Connection
+from net_async.latency import LatencyTracker, max_loops
+
+
+class FakeSession:
+    def __init__(self):
+        self.cleared = 0
+
+    def clear_buffer(self):
+        self.cleared += 1
+
+
+def connection(tracker):
+    session = Connection.__new__(Connection)
+    session.ip_address = '10.0.0.1'
+    session.latency_tracker = tracker
+    session.session = FakeSession()
+    session.timeout_errors = (OSError,)
+    return session
+
+
+def test_timeout_follows_learned_latency():
+    tracker = LatencyTracker(headroom=3, min_timeout=2)
+    assert tracker.timeout('10.0.0.1', 'show version') == tracker.default_timeout
+    tracker.record('10.0.0.1', 'show version', 0.5)
+    assert tracker.timeout('10.0.0.1', 'show version') == 2
+    tracker.record('10.0.0.1', 'show tech-support', 30)
+    assert tracker.timeout('10.0.0.1', 'show tech-support') == 90
+    assert max_loops(90) == 450
+
+
+def test_timeout_recorded_as_peak():
+    tracker = LatencyTracker(headroom=3, max_timeout=600)
+    tracker.record('10.0.0.1', 'config_set', 5)
+    assert tracker.record_timeout('10.0.0.1', 'config_set', 15) == 45
+    assert tracker.latencies['10.0.0.1']['config_set']['ewma'] == 5
+    assert tracker.record_timeout('10.0.0.1', 'config_set', 450) == 600
+
+
+def test_timed_out_show_command_is_resent_with_longer_timeout():
+    tracker = LatencyTracker(headroom=3)
+    tracker.record('10.0.0.1', 'show version', 1)
+    session = connection(tracker)
+    reads = []
+
+    def send(delay_factor, max_loops):
+        reads.append(max_loops)
+        if len(reads) == 1:
+            raise OSError('Search pattern never detected')
+        return 'output'
+
+    assert session.timed_send('show version', send, resend=True) == 'output'
+    assert reads[0] == max_loops(3)
+    assert reads[1] > reads[0]
+    assert session.session.cleared == 1
+
+
+def test_timed_out_config_set_is_not_resent_and_is_recorded():
+    tracker = LatencyTracker(headroom=3)
+    session = connection(tracker)
+
+    def send(delay_factor, max_loops):
+        raise OSError('Timed out')
+
+    with pytest.raises(OSError):
+        session.timed_send('config_set', send)
+    assert 'config_set' in tracker.latencies['10.0.0.1']
+    assert session.session.cleared == 0
+
+
+def test_delay_factor_override():
+    session = connection(LatencyTracker())
+    assert session.timed_send('show version', lambda **read: read, delay_factor=5) == {'delay_factor': 5}
@@ -0,0 +1,42 @@
+import pytest
+
+from net_async.exceptions import InputError
+from net_async.handlers import AsyncSessions
+from net_async.metrics import RunReport
+
+
+def add_devices(report, count):
+    for num in range(count):
+        timings = {'setup': float(num), 'function': 1.0, 'disconnect': 0.0}
+        report.add(f'10.0.{num // 256}.{num % 256}', timings, num % 10 != 0)
+
+
+def test_aggregates_match_kept_devices():
+    kept = RunReport()
+    aggregated = RunReport(keep_devices=False, sample_size=2000)
+    for report in (kept, aggregated):
+        add_devices(report, 1000)
+    assert aggregated.devices == {}
+    assert aggregated.summary() == kept.summary()
+
+
+def test_aggregates_stay_bounded():
+    report = RunReport(keep_devices=False, slowest=5, sample_size=100)
+    add_devices(report, 5000)
+    summary = report.summary(slowest=5)
+    assert summary['devices'] == 5000
+    assert summary['failed_devices'] == 500
+    assert summary['phases']['setup']['count'] == 5000
+    assert summary['phases']['setup']['max'] == 4999.0
+    assert all(len(stat['sample']) == 100 for stat in report.phases.values())
+    assert [seconds for _, seconds in summary['slowest_devices']] == [5000.0, 4999.0, 4998.0, 4997.0, 4996.0]
+    with pytest.raises(InputError):
+        report.makespan(['10.0.0.1'], 10)
+
+
+def test_stream_without_report():
+    results = list(AsyncSessions.stream(
+        'username', 'password', ['127.0.0.1'], lambda session: None, prescan=True, prescan_timeout=1, ssh_port=1,
+        telnet_port=1
+    ))
+    assert [result['device']['exception'] for result in results] == ['Unreachable']
@@ -0,0 +1,32 @@
+import asyncio
+import errno
+
+from net_async import prescan
+
+
+def fake_open_connection(errors):
+    async def open_connection(ip_address, port):
+        raise OSError(errors[(ip_address, port)], 'error')
+    return open_connection
+
+
+def test_closed_ports_are_unreachable(monkeypatch):
+    errors = {('10.0.0.1', 22): errno.ECONNREFUSED, ('10.0.0.1', 23): errno.EHOSTUNREACH}
+    monkeypatch.setattr(asyncio, 'open_connection', fake_open_connection(errors))
+    assert prescan.reachability_scan(['10.0.0.1'], timeout=1) == {'10.0.0.1': None}
+
+
+def test_local_probe_failure_gives_no_hint(monkeypatch):
+    errors = {
+        ('10.0.0.1', 22): errno.EMFILE, ('10.0.0.1', 23): errno.ECONNREFUSED,
+        ('10.0.0.2', 22): errno.ECONNREFUSED, ('10.0.0.2', 23): errno.ENOBUFS
+    }
+    monkeypatch.setattr(asyncio, 'open_connection', fake_open_connection(errors))
+    assert prescan.reachability_scan(['10.0.0.1', '10.0.0.2'], timeout=1) == {}
+
+
+def test_timeout_is_closed(monkeypatch):
+    async def open_connection(ip_address, port):
+        await asyncio.sleep(1)
+    monkeypatch.setattr(asyncio, 'open_connection', open_connection)
+    assert asyncio.run(prescan.port_open('10.0.0.1', 22, 0.01)) is False
@@ -0,0 +1,52 @@
+import pytest
+
+from net_async.handlers import unconnected_device
+from net_async.results import JSONLSink, ResultSink, SQLiteSink
+
+
+class MemorySink(ResultSink):
+    def __init__(self):
+        self.stored = []
+
+    def append(self, result):
+        self.stored.append(result)
+        return len(self.stored) - 1
+
+    def load(self, key):
+        return self.stored[key]
+
+    def results(self):
+        return iter(self.stored)
+
+
+def results():
+    device = dict(unconnected_device('10.0.0.1', 'None'), hostname='R1', connection_type='SSH')
+    return [
+        {'device': device, 'output': {'show version': 'v1'}, 'successful': True},
+        {'device': unconnected_device('10.0.0.2', 'NetmikoTimeoutException'), 'output': None, 'successful': False}
+    ]
+
+
+def test_sink_missing_methods_fails_on_construction():
+    class PartialSink(ResultSink):
+        def append(self, result):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialSink()
+    with pytest.raises(TypeError):
+        ResultSink()
+
+
+@pytest.mark.parametrize('make_sink', [
+    lambda tmp_path: MemorySink(),
+    lambda tmp_path: JSONLSink(tmp_path / 'results.jsonl'),
+    lambda tmp_path: SQLiteSink(str(tmp_path / 'results.sqlite'))
+])
+def test_sinks_round_trip(tmp_path, make_sink):
+    with make_sink(tmp_path) as sink:
+        records = [sink.write(result) for result in results()]
+        assert [record.successful for record in records] == [True, False]
+        assert records[0]['hostname'] == 'R1'
+        assert sink.get(records[1]) == results()[1]
+        assert list(sink) == [{'device': results()[0]['device'], 'output': {'show version': 'v1'}}]
@@ -0,0 +1,159 @@
+from threading import Event, Thread
+
+import pytest
+
+from net_async import scheduler
+from net_async.exceptions import InputError
+from net_async.scheduler import DurationHistory, Scheduler
+
+
+def history_of(durations):
+    history = DurationHistory()
+    for ip_address, seconds in durations.items():
+        history.device_completed(ip_address, {'setup': seconds}, True)
+    return history
+
+
+def slow_subnet_and_fast_subnets():
+    durations = {f'10.0.0.{num}': 100.0 for num in range(1, 6)}
+    durations.update({f'10.1.{num}.1': 1.0 for num in range(20)})
+    return durations
+
+
+def test_longest_first_without_group_limits():
+    durations = slow_subnet_and_fast_subnets()
+    mgmt_ips = list(durations)[::-1]
+    order = Scheduler(group_by=24, longest_first=True, history=history_of(durations)).order(mgmt_ips)
+    assert sorted(order.index(f'10.0.0.{num}') for num in range(1, 6)) == [0, 1, 2, 3, 4]
+
+
+def test_limited_groups_are_interleaved():
+    durations = slow_subnet_and_fast_subnets()
+    scheduler = Scheduler(
+        group_by=24, group_limits={'10.0.0.0/24': 2, '10.1.0.0/24': 1}, longest_first=True,
+        history=history_of(durations)
+    )
+    order = scheduler.order(list(durations))
+    assert order[:2] == ['10.0.0.1', '10.1.0.1']
+    assert sorted(order) == sorted(durations)
+
+
+def test_file_order_kept_without_limits():
+    mgmt_ips = ['10.0.0.1', '10.0.0.2', '10.0.1.1']
+    assert Scheduler(group_by=24).order(mgmt_ips) == mgmt_ips
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, 'monotonic', fake.monotonic)
+    monkeypatch.setattr(scheduler, 'sleep', fake.sleep)
+    return fake
+
+
+def result(successful, exception='None'):
+    return {'successful': successful, 'device': {'exception': exception}}
+
+
+def acquire_in_thread(scheduler_, ip_address):
+    acquired = Event()
+
+    def acquire():
+        scheduler_.acquire(ip_address)
+        acquired.set()
+
+    thread = Thread(target=acquire, daemon=True)
+    thread.start()
+    return acquired, thread
+
+
+def test_group_limit_blocks_until_release():
+    scheduler_ = Scheduler(group_by=24, default_group_limit=1)
+    scheduler_.acquire('10.0.0.1')
+    acquired, thread = acquire_in_thread(scheduler_, '10.0.0.2')
+    assert not acquired.wait(0.2)
+    scheduler_.acquire('10.0.1.1')
+    scheduler_.release('10.0.0.1')
+    assert acquired.wait(5)
+    thread.join(5)
+    assert scheduler_.group_active == {'10.0.0.0/24': 1, '10.0.1.0/24': 1}
+
+
+def test_group_limits_and_global_limit():
+    scheduler_ = Scheduler(max_sessions=3, group_by={'10.0.0.1': 'wan', '10.0.0.2': 'wan'}, group_limits={'wan': 1})
+    scheduler_.acquire('10.0.0.1')
+    assert not scheduler_.available('wan')
+    assert scheduler_.available(None)
+    scheduler_.acquire('10.0.0.3')
+    scheduler_.acquire('10.0.0.4')
+    assert not scheduler_.available(None)
+    scheduler_.release('10.0.0.3')
+    assert scheduler_.available(None)
+    assert not scheduler_.available('wan')
+    scheduler_.release('10.0.0.1')
+    assert scheduler_.available('wan')
+
+
+def test_token_bucket_waits_for_refill(clock):
+    scheduler_ = Scheduler(rate=2, burst=2)
+    for ip_address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+        scheduler_.acquire(ip_address)
+    assert clock.sleeps == [0.5]
+    scheduler_.acquire('10.0.0.4')
+    assert clock.sleeps == [0.5, 0.5]
+    clock.now += 1
+    for ip_address in ('10.0.0.5', '10.0.0.6'):
+        scheduler_.acquire(ip_address)
+    assert clock.sleeps == [0.5, 0.5]
+    scheduler_.acquire('10.0.0.7')
+    assert clock.sleeps == [0.5, 0.5, 0.5]
+
+
+def test_adaptive_backoff_and_recovery(clock):
+    scheduler_ = Scheduler(max_sessions=8, adaptive=True, min_sessions=2, backoff_threshold=0.1, cooldown=5)
+    scheduler_.adapt(result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 8
+    scheduler_.adapt(result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 4
+    scheduler_.adapt(result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 4
+    clock.now += 5
+    scheduler_.adapt(result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 2
+    clock.now += 5
+    scheduler_.adapt(result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 2
+    scheduler_.adapt(result(False, 'AuthenticationException'))
+    assert scheduler_.concurrency() == 2
+    for _ in range(3):
+        scheduler_.adapt(result(True))
+    assert scheduler_.concurrency() == 3
+    for _ in range(100):
+        scheduler_.adapt(result(True))
+    assert scheduler_.concurrency() == 8
+
+
+def test_release_adapts_limit(clock):
+    scheduler_ = Scheduler(max_sessions=4, adaptive=True, backoff_threshold=0.0)
+    scheduler_.acquire('10.0.0.1')
+    scheduler_.release('10.0.0.1', result(False, 'NetmikoTimeoutException'))
+    assert scheduler_.concurrency() == 2
+    assert scheduler_.active == 0
+
+
+def test_adaptive_requires_max_sessions():
+    with pytest.raises(InputError):
+        Scheduler(adaptive=True)
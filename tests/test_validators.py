@@ -0,0 +1,29 @@
+from net_async.validators import MgmtIPAddresses
+
+
+def test_ipv6_spellings_are_one_address():
+    mgmt = MgmtIPAddresses(['2001:db8::1', '2001:DB8:0:0::1', '2001:0db8:0:0:0:0:0:1'], allow_ipv6=True, dedup=True)
+    assert mgmt.mgmt_ips == ['2001:db8::1']
+    assert mgmt.duplicates == ['2001:db8::1', '2001:db8::1']
+    assert '2001:DB8::0:1' in mgmt
+
+
+def test_expanded_ipv6_duplicates_listed_address():
+    mgmt = MgmtIPAddresses(['2001:DB8::2', '2001:db8::/126'], expand=True, allow_ipv6=True, dedup=True)
+    assert mgmt.mgmt_ips == ['2001:db8::2', '2001:db8::1', '2001:db8::3']
+    assert mgmt.index['2001:db8::2'] == 1
+
+
+def test_invalid_lines_are_reported():
+    mgmt = MgmtIPAddresses(['10.0.0.1', '10.0.0.256', '2001:db8::1'])
+    assert not mgmt.valid
+    assert mgmt.invalid_line_nums == ['2', '3']
+    assert mgmt.mgmt_ips == ['10.0.0.1']
+
+
+def test_ipv6_networks_and_ranges_require_allow_ipv6():
+    lines = ['2001:db8::/126', '2001:db8::1-2001:db8::3', '10.0.0.0/30']
+    mgmt = MgmtIPAddresses(lines, expand=True)
+    assert mgmt.invalid_line_nums == ['1', '2']
+    assert mgmt.mgmt_ips == ['10.0.0.1', '10.0.0.2']
+    assert MgmtIPAddresses(lines, expand=True, allow_ipv6=True).valid